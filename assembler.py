@@ -0,0 +1,464 @@
+"""
+Encodes the AT&T syntax subset emitted by CodeGen to x86-64 machine code.
+
+Instructions are encoded like the GNU assembler does, except that jumps are
+never relaxed to their short forms. References to labels are resolved by
+link, once the address of the code is known.
+"""
+
+import re
+import struct
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from instruction_selection import fits_int32
+from peephole import parse
+
+REGISTERS_64 = [
+    "rax",
+    "rcx",
+    "rdx",
+    "rbx",
+    "rsp",
+    "rbp",
+    "rsi",
+    "rdi",
+    "r8",
+    "r9",
+    "r10",
+    "r11",
+    "r12",
+    "r13",
+    "r14",
+    "r15",
+]
+REGISTERS_32 = [
+    "eax",
+    "ecx",
+    "edx",
+    "ebx",
+    "esp",
+    "ebp",
+    "esi",
+    "edi",
+    "r8d",
+    "r9d",
+    "r10d",
+    "r11d",
+    "r12d",
+    "r13d",
+    "r14d",
+    "r15d",
+]
+REGISTERS_8 = ["al", "cl", "dl", "bl"]
+MEMORY_OPERAND = re.compile(
+    r"^(?P<disp>[^(]*)\((?P<base>%\w+)?(?:,(?P<index>%\w+)(?:,(?P<scale>\d))?)?\)$"
+)
+LABEL = re.compile(r"^[A-Za-z_.][\w.]*$")
+SCALES = {1: 0, 2: 1, 4: 2, 8: 3}
+# The /digit of the 0x81/0x83 immediate forms, and the opcode of the
+# "op reg, r/m" form
+ARITHMETIC = {
+    "add": (0, 0x01),
+    "sub": (5, 0x29),
+    "xor": (6, 0x31),
+    "cmp": (7, 0x39),
+}
+SHIFTS = {"shl": 4, "shr": 5, "sar": 7}
+# Single operand instructions of the 0xf7 group
+UNARY = {"neg": 3, "mul": 4, "imul": 5, "div": 6, "idiv": 7}
+INCREMENTS = {"inc": 0, "dec": 1}
+JUMPS = {
+    "jmp": b"\xe9",
+    "je": b"\x0f\x84",
+    "jz": b"\x0f\x84",
+    "jne": b"\x0f\x85",
+    "jnz": b"\x0f\x85",
+    "js": b"\x0f\x88",
+    "jns": b"\x0f\x89",
+}
+FIXED = {"ret": b"\xc3", "cqo": b"\x48\x99", "syscall": b"\x0f\x05"}
+# Size suffixes, only needed when no operand is a register
+SUFFIXES = {"q": 64, "l": 32, "b": 8}
+ESCAPES = {"n": "\n", "t": "\t", "\\": "\\", '"': '"', "0": "\0"}
+
+
+class AssemblerError(ValueError):
+    pass
+
+
+@dataclass
+class Register:
+    number: int
+    size: int
+
+
+@dataclass
+class Immediate:
+    value: int
+
+
+@dataclass
+class Memory:
+    displacement: int = 0
+    base: Optional[Register] = None
+    index: Optional[Register] = None
+    scale: int = 1
+    # Label addressed relative to rip
+    label: Optional[str] = None
+
+
+@dataclass
+class Fixup:
+    """A 32 bit field holding label - end, end being relative to the section"""
+
+    section: str
+    offset: int
+    label: str
+    end: int
+
+
+def parse_register(name: str) -> Register:
+    name = name[1:]
+    for size, names in ((64, REGISTERS_64), (32, REGISTERS_32), (8, REGISTERS_8)):
+        if name in names:
+            return Register(names.index(name), size)
+    raise AssemblerError(f"Unknown register %{name}")
+
+
+def parse_operand(operand: str):
+    if operand.startswith("$"):
+        return Immediate(int(operand[1:], 0))
+    if operand.startswith("%"):
+        return parse_register(operand)
+    match = MEMORY_OPERAND.match(operand)
+    if match is None:
+        raise AssemblerError(f"Unsupported operand {operand}")
+    displacement = match["disp"]
+    if match["base"] == "%rip":
+        return Memory(label=displacement)
+    return Memory(
+        displacement=int(displacement, 0) if displacement else 0,
+        base=parse_register(match["base"]) if match["base"] else None,
+        index=parse_register(match["index"]) if match["index"] else None,
+        scale=int(match["scale"] or 1),
+    )
+
+
+def fits_int8(value: int) -> bool:
+    return -0x80 <= value <= 0x7F
+
+
+def pack_immediate(value: int, size: int, sign_extended: bool = False) -> bytes:
+    """
+    Little endian, accepting both signed and unsigned values of size bytes,
+    or only signed ones if the CPU sign-extends them to a wider operand
+    """
+    bits = 8 * size
+    high = 1 << (bits - 1 if sign_extended else bits)
+    if not -(1 << (bits - 1)) <= value < high:
+        raise AssemblerError(f"Immediate {value} doesn't fit in the instruction")
+    return (value & ((1 << (8 * size)) - 1)).to_bytes(size, "little")
+
+
+class Assembler:
+    def __init__(self):
+        self.sections: Dict[str, bytearray] = {
+            ".text": bytearray(),
+            ".rodata": bytearray(),
+        }
+        self.section = ".text"
+        self.labels: Dict[str, Tuple[str, int]] = {}
+        self.fixups: List[Fixup] = []
+
+    @property
+    def code(self) -> bytearray:
+        return self.sections[self.section]
+
+    def assemble(self, lines: List[str]):
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            if line.endswith(":"):
+                self.define_label(line[:-1])
+            elif line.startswith("."):
+                self.directive(line)
+            else:
+                self.instruction(line)
+        return self
+
+    def define_label(self, label: str):
+        if label in self.labels:
+            raise AssemblerError(f"Label {label} is defined twice")
+        self.labels[label] = (self.section, len(self.code))
+
+    def directive(self, line: str):
+        name, _, argument = line.partition(" ")
+        if name == ".section":
+            self.section = argument.strip()
+            self.sections.setdefault(self.section, bytearray())
+        elif name == ".text":
+            self.section = ".text"
+        elif name == ".asciz":
+            self.code.extend(self.string(argument.strip()) + b"\0")
+        elif name not in (".global", ".globl"):
+            raise AssemblerError(f"Unsupported directive {name}")
+
+    @staticmethod
+    def string(literal: str) -> bytes:
+        content = literal[1:-1]
+        return re.sub(r"\\(.)", lambda match: ESCAPES[match[1]], content).encode()
+
+    def link(self, address: int) -> bytes:
+        """The sections laid out one after the other from address"""
+        image = bytearray()
+        section_addresses = {}
+        for name, code in self.sections.items():
+            if code:
+                image.extend(bytes(-len(image) % 8))
+            section_addresses[name] = address + len(image)
+            image.extend(code)
+        for fixup in self.fixups:
+            target = self.address_of(fixup.label, section_addresses)
+            origin = section_addresses[fixup.section] + fixup.end
+            position = section_addresses[fixup.section] - address + fixup.offset
+            image[position : position + 4] = struct.pack("<i", target - origin)
+        return bytes(image)
+
+    def address_of(self, label: str, section_addresses: Dict[str, int]) -> int:
+        try:
+            section, offset = self.labels[label]
+        except KeyError:
+            raise AssemblerError(f"Undefined label {label}") from None
+        return section_addresses[section] + offset
+
+    def instruction(self, line: str):
+        mnemonic, operands = parse(line)
+        if mnemonic == "call" or mnemonic in JUMPS:
+            self.branch(mnemonic, operands)
+            return
+        operands = [parse_operand(operand) for operand in operands]
+        if mnemonic in FIXED:
+            self.code.extend(FIXED[mnemonic])
+        elif mnemonic in ("push", "pop"):
+            self.stack(mnemonic, operands)
+        else:
+            base, size = self.split_suffix(mnemonic, operands)
+            encoder = getattr(self, f"encode_{base}", None)
+            if encoder is None and base in ARITHMETIC:
+                encoder = self.encode_arithmetic
+            if encoder is None and base in SHIFTS:
+                encoder = self.encode_shift
+            if encoder is None and base in INCREMENTS:
+                encoder = self.encode_increment
+            if encoder is None:
+                raise AssemblerError(f"Unsupported instruction {line}")
+            encoder(base, size, operands)
+
+    @staticmethod
+    def split_suffix(mnemonic: str, operands) -> Tuple[str, int]:
+        sizes = {operand.size for operand in operands if type(operand) is Register}
+        base, size = mnemonic, None
+        if mnemonic == "movslq":
+            return mnemonic, 64
+        if mnemonic[-1] in SUFFIXES and mnemonic[:-1] in KNOWN_MNEMONICS:
+            base, size = mnemonic[:-1], SUFFIXES[mnemonic[-1]]
+        if size is None and len(sizes) == 1:
+            size = sizes.pop()
+        elif size is None and base == "lea":
+            size = 64
+        if size is None:
+            raise AssemblerError(f"Operand size of {mnemonic} is ambiguous")
+        return base, size
+
+    def emit(
+        self,
+        opcode: bytes,
+        size: int,
+        reg: int,
+        rm,
+        immediate: bytes = b"",
+    ):
+        """Emits an instruction with a ModRM byte, reg being a number or /digit"""
+        rex = 0x08 if size == 64 else 0
+        if reg >= 8:
+            rex |= 0x04
+        modrm, rex_bits, fixup_label = self.modrm(reg & 7, rm)
+        rex |= rex_bits
+        if rex:
+            self.code.append(0x40 | rex)
+        self.code.extend(opcode)
+        self.code.extend(modrm)
+        if fixup_label is not None:
+            end = len(self.code) + len(immediate)
+            self.fixups.append(
+                Fixup(self.section, len(self.code) - 4, fixup_label, end)
+            )
+        self.code.extend(immediate)
+
+    @staticmethod
+    def modrm(reg: int, rm) -> Tuple[bytes, int, Optional[str]]:
+        """ModRM, SIB and displacement bytes, the REX bits they need and rip label"""
+        if type(rm) is Register:
+            return bytes([0xC0 | reg << 3 | rm.number & 7]), (rm.number >> 3), None
+        if rm.label is not None:
+            return bytes([reg << 3 | 0b101]) + bytes(4), 0, rm.label
+        if rm.base is None:
+            raise AssemblerError("Memory operands need a base register")
+        rex = rm.base.number >> 3
+        base = rm.base.number & 7
+        displacement = rm.displacement
+        if displacement == 0 and base != 0b101:
+            mod, disp = 0b00, b""
+        elif fits_int8(displacement):
+            mod, disp = 0b01, pack_immediate(displacement, 1)
+        elif fits_int32(displacement):
+            mod, disp = 0b10, pack_immediate(displacement, 4)
+        else:
+            raise AssemblerError(f"Displacement {displacement} is too large")
+        if rm.index is None and base != 0b100:
+            return bytes([mod << 6 | reg << 3 | base]) + disp, rex, None
+        if rm.index is None:
+            index = 0b100
+        elif rm.index.number == 0b100:
+            raise AssemblerError("%rsp can't be an index")
+        else:
+            index = rm.index.number & 7
+            rex |= (rm.index.number >> 3) << 1
+        sib = SCALES[rm.scale] << 6 | index << 3 | base
+        return bytes([mod << 6 | reg << 3 | 0b100, sib]) + disp, rex, None
+
+    def branch(self, mnemonic: str, operands: List[str]):
+        (label,) = operands
+        if not LABEL.match(label):
+            raise AssemblerError(f"{mnemonic} needs a label")
+        opcode = b"\xe8" if mnemonic == "call" else JUMPS[mnemonic]
+        self.code.extend(opcode)
+        self.fixups.append(
+            Fixup(self.section, len(self.code), label, len(self.code) + 4)
+        )
+        self.code.extend(bytes(4))
+
+    def stack(self, mnemonic: str, operands):
+        (register,) = operands
+        if type(register) is not Register or register.size != 64:
+            raise AssemblerError(f"{mnemonic} needs a 64 bit register")
+        if register.number >= 8:
+            self.code.append(0x41)
+        self.code.append((0x50 if mnemonic == "push" else 0x58) | register.number & 7)
+
+    def encode_mov(self, _, size: int, operands):
+        source, dest = operands
+        if size == 8:
+            if type(source) is Immediate:
+                self.emit(b"\xc6", 8, 0, dest, pack_immediate(source.value, 1))
+            else:
+                self.emit(b"\x88", 8, source.number, dest)
+        elif type(source) is Immediate:
+            value = source.value
+            if type(dest) is Register and (size == 32 or not fits_int32(value)):
+                # mov $imm32, %r32 and movabs $imm64, %r64
+                immediate_size = size // 8
+                if size == 64:
+                    self.code.append(0x48 | dest.number >> 3)
+                elif dest.number >= 8:
+                    self.code.append(0x41)
+                self.code.append(0xB8 | dest.number & 7)
+                self.code.extend(pack_immediate(value, immediate_size))
+            else:
+                immediate = pack_immediate(value, 4, sign_extended=size == 64)
+                self.emit(b"\xc7", size, 0, dest, immediate)
+        elif type(source) is Register:
+            self.emit(b"\x89", size, source.number, dest)
+        else:
+            self.emit(b"\x8b", size, dest.number, source)
+
+    def encode_movslq(self, _, size: int, operands):
+        source, dest = operands
+        self.emit(b"\x63", 64, dest.number, source)
+
+    def encode_lea(self, _, size: int, operands):
+        source, dest = operands
+        self.emit(b"\x8d", size, dest.number, source)
+
+    def encode_arithmetic(self, mnemonic: str, size: int, operands):
+        digit, opcode = ARITHMETIC[mnemonic]
+        source, dest = operands
+        if type(source) is Immediate:
+            if fits_int8(source.value):
+                self.emit(b"\x83", size, digit, dest, pack_immediate(source.value, 1))
+            else:
+                immediate = pack_immediate(source.value, 4, sign_extended=size == 64)
+                self.emit(b"\x81", size, digit, dest, immediate)
+        elif type(source) is Register:
+            self.emit(bytes([opcode]), size, source.number, dest)
+        else:
+            self.emit(bytes([opcode + 2]), size, dest.number, source)
+
+    def encode_test(self, _, size: int, operands):
+        source, dest = operands
+        self.emit(b"\x85", size, source.number, dest)
+
+    def encode_xchg(self, _, size: int, operands):
+        first, second = operands
+        if type(first) is Register and type(second) is Register:
+            if first.number == 0 or second.number == 0:
+                other = second if first.number == 0 else first
+                if size == 64:
+                    self.code.append(0x48 | other.number >> 3)
+                self.code.append(0x90 | other.number & 7)
+                return
+        if type(first) is not Register:
+            first, second = second, first
+        self.emit(b"\x87", size, first.number, second)
+
+    def encode_shift(self, mnemonic: str, size: int, operands):
+        count, dest = operands
+        if count.value == 1:
+            self.emit(b"\xd1", size, SHIFTS[mnemonic], dest)
+        else:
+            self.emit(
+                b"\xc1", size, SHIFTS[mnemonic], dest, pack_immediate(count.value, 1)
+            )
+
+    def encode_increment(self, mnemonic: str, size: int, operands):
+        (dest,) = operands
+        self.emit(b"\xff", size, INCREMENTS[mnemonic], dest)
+
+    def encode_imul(self, mnemonic: str, size: int, operands):
+        if len(operands) == 1:
+            self.encode_unary(mnemonic, size, operands)
+            return
+        if len(operands) == 2 and type(operands[0]) is Immediate:
+            operands = [operands[0], operands[1], operands[1]]
+        if len(operands) == 3:
+            factor, source, dest = operands
+            if fits_int8(factor.value):
+                self.emit(
+                    b"\x6b", size, dest.number, source, pack_immediate(factor.value, 1)
+                )
+            else:
+                immediate = pack_immediate(factor.value, 4, sign_extended=size == 64)
+                self.emit(b"\x69", size, dest.number, source, immediate)
+            return
+        source, dest = operands
+        self.emit(b"\x0f\xaf", size, dest.number, source)
+
+    def encode_unary(self, mnemonic: str, size: int, operands):
+        (operand,) = operands
+        self.emit(b"\xf7", size, UNARY[mnemonic], operand)
+
+    encode_neg = encode_mul = encode_div = encode_idiv = encode_unary
+
+
+KNOWN_MNEMONICS = {
+    "mov",
+    "lea",
+    "xchg",
+    "test",
+    *ARITHMETIC,
+    *SHIFTS,
+    *UNARY,
+    *INCREMENTS,
+}
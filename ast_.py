@@ -23,9 +23,6 @@ class BinaryOperation:
     def __post_init__(self):
         self.order = BinaryOperation.ORDER_OF_OPERATIONS[self.operator.value]
 
-    def is_lower_order(self, other):
-        return other.order < self.order and not other.is_parenthseized
-
     def parenthesize(self):
         self.is_parenthseized = True
         return self
@@ -1,48 +1,69 @@
-from functools import singledispatchmethod
+from typing import Dict
 
 from tokens import Literal, Identifier
 import ast_ as ast
-from ir import LoadConstant, LoadVariable, UnaryOperation, BinaryOperation, Return
+from ir import LoadConstant, LoadVariable, Negate, BinaryOperation, Return
+from dispatch import dispatchmethod
+from trampoline import trampoline
 
 
 class LoweringPass:
     def __init__(self):
         self.ir = []
         self.temporaries_count = 0
+        # The value each variable currently holds
+        self.variables: Dict[str, str] = {}
+        # Sethi-Ullman labels of the current statement's nodes, by id
+        self.labels: Dict[int, int] = {}
 
     def lower(self, ast: list):
         for node in ast:
-            self.lower_once(node)
+            self.labels = sethi_ullman_labels(node)
+            trampoline(self.lower_once(node))
         return self.ir
 
-    @singledispatchmethod
+    @dispatchmethod
     def lower_once(self, node):
         raise TypeError(f"No lowering implemented for {type(node)}")
 
     @lower_once.register
     def _(self, statement: ast.Decleration):
-        var = self.lower_once(statement.expr)
-        self.ir.append(LoadVariable(statement.identifier.value, var))
+        var = yield self.lower_once(statement.expr)
+        self.assign(statement.identifier, var)
 
     @lower_once.register
     def _(self, statement: ast.Assignment):
-        var = self.lower_once(statement.src)
-        self.ir.append(LoadVariable(statement.dst.value, var))
+        var = yield self.lower_once(statement.src)
+        self.assign(statement.dst, var)
+
+    def assign(self, identifier: Identifier, var: str):
+        dest = self.new_temp_var()
+        self.ir.append(LoadVariable(dest, var))
+        self.variables[identifier.value] = dest
 
     @lower_once.register
     def _(self, statement: ast.Return):
-        self.ir.append(Return(self.lower_once(statement.expr)))
+        var = yield self.lower_once(statement.expr)
+        self.ir.append(Return(var))
 
     @lower_once.register
     def _(self, unary_op: ast.UnaryOperation):
-        var = self.lower_once(unary_op.operand)
-        self.ir.append(UnaryOperation(unary_op.operator.value, var))
-        return var
+        assert unary_op.operator.value == "-"
+        var = yield self.lower_once(unary_op.operand)
+        dest = self.new_temp_var()
+        self.ir.append(Negate(dest, var))
+        return dest
 
     @lower_once.register
     def _(self, binary_op: ast.BinaryOperation):
-        rhs = self.lower_once(binary_op.rhs)
-        lhs = self.lower_once(binary_op.lhs)
+        # The operand needing more registers goes first, while fewer values
+        # are live. Operands keep their position in the operation.
+        if self.labels[id(binary_op.lhs)] > self.labels[id(binary_op.rhs)]:
+            lhs = yield self.lower_once(binary_op.lhs)
+            rhs = yield self.lower_once(binary_op.rhs)
+        else:
+            rhs = yield self.lower_once(binary_op.rhs)
+            lhs = yield self.lower_once(binary_op.lhs)
         dest = self.new_temp_var()
         self.ir.append(BinaryOperation(dest, binary_op.operator.value, lhs, rhs))
         return dest
@@ -55,11 +76,47 @@ class LoweringPass:
 
     @lower_once.register
     def _(self, identifier: Identifier):
-        return identifier.value
+        return self.variables[identifier.value]
 
     def new_temp_var(self) -> str:
         old_count = self.temporaries_count
         self.temporaries_count += 1
-        # Uniqeness guaranteed
-        # The percent-sign is not a valid prefix for user defined variables
+        # Every value is defined exactly once
         return f"%{old_count}"
+
+
+def sethi_ullman_labels(root) -> Dict[int, int]:
+    """
+    Number of registers needed to evaluate each expression node of root
+    without spilling, by node id. Computed iteratively in post order, the
+    trees may be too deep to recurse.
+    """
+    labels: Dict[int, int] = {}
+    stack = [(root, False)]
+    while stack:
+        node, children_done = stack.pop()
+        children = expression_children(node)
+        if not children_done and children:
+            stack.append((node, True))
+            stack.extend((child, False) for child in children)
+            continue
+        if type(node) is ast.BinaryOperation:
+            lhs, rhs = labels[id(node.lhs)], labels[id(node.rhs)]
+            labels[id(node)] = lhs + 1 if lhs == rhs else max(lhs, rhs)
+        elif children:
+            labels[id(node)] = labels[id(children[0])]
+        else:
+            labels[id(node)] = 1
+    return labels
+
+
+def expression_children(node) -> list:
+    if type(node) is ast.BinaryOperation:
+        return [node.lhs, node.rhs]
+    if type(node) is ast.UnaryOperation:
+        return [node.operand]
+    if type(node) in (ast.Decleration, ast.Return):
+        return [node.expr]
+    if type(node) is ast.Assignment:
+        return [node.src]
+    return []
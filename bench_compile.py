@@ -0,0 +1,298 @@
+"""
+Compile throughput and scaling of every pass, on generated programs.
+
+Programs of 10^2 statements up to --max-statements are generated by
+program_generator and compiled at -O, timing each pass. Results can be saved
+as a baseline, which compare runs again and diffs against.
+
+    python bench_compile.py run [--max-statements N] [--save FILE] [shape options]
+    python bench_compile.py compare BASELINE [CURRENT] [--threshold F]
+"""
+
+import argparse
+import json
+import math
+import sys
+from dataclasses import asdict, dataclass
+from typing import Dict, List
+
+from compiler import compile_source
+from instrumentation import Instrumentation
+from program_generator import ProgramShape, generate_program
+
+# Small programs are compiled repeatedly, keeping the fastest compilation,
+# until about this many statements were compiled
+REPEAT_STATEMENTS = 20_000
+MAX_REPEATS = 20
+# Passes of compile_source, when not streaming
+PASSES = [
+    "lex",
+    "parse",
+    "analyze",
+    "lower",
+    "optimize",
+    "verify",
+    "codegen",
+    "peephole",
+]
+# Passes faster than this on the largest program get no scaling exponent,
+# like the optimizers at -O0 that return at once
+MIN_EXPONENT_SECONDS = 1e-3
+
+
+@dataclass
+class Measurement:
+    statements: int
+    tokens: int
+    nodes: int
+    # Seconds spent in every pass, by name
+    passes: Dict[str, float]
+
+    @property
+    def total_seconds(self) -> float:
+        return sum(self.passes.values())
+
+
+def measure(shape: ProgramShape, opt_level: int) -> Measurement:
+    source = generate_program(shape)
+    repeats = max(1, min(MAX_REPEATS, REPEAT_STATEMENTS // max(1, shape.statements)))
+    fastest = None
+    for _ in range(repeats):
+        # Memory isn't traced, it slows down the passes unevenly
+        instrumentation = Instrumentation(trace_memory=False)
+        # Not streamed, so that lexing is timed on its own at every size
+        compile_source(
+            source, opt_level, instrumentation=instrumentation, streaming=False
+        )
+        if fastest is None or instrumentation.total_seconds() < fastest.total_seconds():
+            fastest = instrumentation
+    records = {record.name: record for record in fastest.passes}
+    return Measurement(
+        shape.statements,
+        records["lex"].items["tokens"],
+        records["parse"].items["nodes"],
+        {record.name: record.seconds for record in fastest.passes},
+    )
+
+
+def scaling_exponent(sizes: List[int], seconds: List[float]) -> float:
+    """The k of seconds ~ sizes^k, by least squares on the logarithms"""
+    xs = [math.log(size) for size in sizes]
+    ys = [math.log(max(second, 1e-9)) for second in seconds]
+    mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+    variance = sum((x - mean_x) ** 2 for x in xs)
+    if variance == 0:
+        return float("nan")
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / variance
+
+
+def exponents(measurements: List[Measurement]) -> Dict[str, float]:
+    sizes = [measurement.statements for measurement in measurements]
+    largest = measurements[-1]
+    names = [
+        name
+        for name, seconds in largest.passes.items()
+        if seconds >= MIN_EXPONENT_SECONDS
+    ]
+    names.append("total")
+    return {
+        name: scaling_exponent(
+            sizes,
+            [
+                (
+                    measurement.total_seconds
+                    if name == "total"
+                    else measurement.passes[name]
+                )
+                for measurement in measurements
+            ],
+        )
+        for name in names
+    }
+
+
+def sizes_up_to(max_statements: int) -> List[int]:
+    sizes = []
+    size = 100
+    while size <= max_statements:
+        sizes.append(size)
+        size *= 10
+    return sizes
+
+
+def benchmark(shape: ProgramShape, sizes: List[int], opt_level: int) -> dict:
+    measurements = []
+    print_header()
+    for size in sizes:
+        shape.statements = size
+        measurement = measure(shape, opt_level)
+        print_measurement(measurement)
+        measurements.append(measurement)
+    results = {
+        "shape": {
+            name: value for name, value in asdict(shape).items() if name != "statements"
+        },
+        "opt_level": opt_level,
+        "measurements": [asdict(measurement) for measurement in measurements],
+        "exponents": exponents(measurements) if len(measurements) > 1 else {},
+    }
+    print_exponents(results["exponents"])
+    return results
+
+
+def print_header():
+    print(
+        f"{'statements':>10} {'tokens':>9} {'nodes':>9} {'total ms':>10} "
+        f"{'tokens/s':>10} {'nodes/s':>10}  "
+        + " ".join(f"{name:>9}" for name in PASSES)
+    )
+
+
+def print_measurement(measurement: Measurement):
+    total = measurement.total_seconds
+    print(
+        f"{measurement.statements:>10} {measurement.tokens:>9} {measurement.nodes:>9} "
+        f"{total * 1000:>10.2f} {measurement.tokens / total:>10.0f} "
+        f"{measurement.nodes / total:>10.0f}  "
+        + " ".join(f"{measurement.passes[name] * 1000:>9.2f}" for name in PASSES)
+    )
+
+
+def print_exponents(exponents: Dict[str, float]):
+    if exponents:
+        print(
+            "scaling exponents: "
+            + " ".join(f"{name}={k:.2f}" for name, k in exponents.items())
+        )
+
+
+def measurements_by_size(results: dict) -> Dict[int, dict]:
+    return {
+        measurement["statements"]: measurement
+        for measurement in results["measurements"]
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> bool:
+    """Prints how much slower current is per size and pass, True if a total regressed"""
+    regressed = False
+    current_sizes = measurements_by_size(current)
+    print(
+        f"{'statements':>10} {'pass':<10} {'baseline ms':>12} {'current ms':>12} {'change':>8}"
+    )
+    for size, before in measurements_by_size(baseline).items():
+        after = current_sizes.get(size)
+        if after is None:
+            continue
+        rows = dict(before["passes"], total=sum(before["passes"].values()))
+        current_rows = dict(after["passes"], total=sum(after["passes"].values()))
+        for name, seconds in rows.items():
+            if name not in current_rows:
+                continue
+            change = current_rows[name] / seconds - 1 if seconds > 0 else 0.0
+            # Only totals count as regressions, small passes are too noisy
+            flag = ""
+            if name == "total" and change > threshold:
+                regressed = True
+                flag = "  REGRESSION"
+            print(
+                f"{size:>10} {name:<10} {seconds * 1000:>12.3f} "
+                f"{current_rows[name] * 1000:>12.3f} {change:>+8.1%}{flag}"
+            )
+    return regressed
+
+
+def parse_operators(argument: str) -> Dict[str, float]:
+    """Parses operator weights written like +=4,-=3,*=2,/=1"""
+    operators = {}
+    for weight in argument.split(","):
+        operator, _, value = weight.partition("=")
+        if operator not in ("+", "-", "*", "/"):
+            raise argparse.ArgumentTypeError(f"Unknown operator: {operator}")
+        operators[operator] = float(value)
+    return operators
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    run = subcommands.add_parser(
+        "run", help="Measure, and save the results as a baseline"
+    )
+    run.add_argument(
+        "--max-statements",
+        type=int,
+        default=100_000,
+        help="Largest program, up to 1000000 (about 5 minutes)",
+    )
+    run.add_argument("--save", metavar="FILE", help="Write the results as JSON")
+    run.add_argument("-O", dest="opt_level", type=int, default=0)
+    defaults = ProgramShape()
+    run.add_argument("--depth", type=int, default=defaults.depth)
+    run.add_argument(
+        "--operators",
+        type=parse_operators,
+        default=defaults.operators,
+        help="Weights of the operators, like +=4,-=3,*=2,/=1",
+    )
+    run.add_argument(
+        "--leaf-probability", type=float, default=defaults.leaf_probability
+    )
+    run.add_argument("--parentheses", type=float, default=defaults.parentheses)
+    run.add_argument("--negation", type=float, default=defaults.negation)
+    run.add_argument("--reuse", type=float, default=defaults.reuse)
+    run.add_argument("--live-variables", type=int, default=defaults.live_variables)
+    run.add_argument("--seed", type=int, default=defaults.seed)
+
+    comparison = subcommands.add_parser(
+        "compare",
+        help="Diff against a baseline, measuring again unless CURRENT is given",
+    )
+    comparison.add_argument("baseline")
+    comparison.add_argument("current", nargs="?")
+    comparison.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="Slowdown of a total counted as a regression",
+    )
+    arguments = parser.parse_args()
+
+    if arguments.command == "run":
+        shape = ProgramShape(
+            depth=arguments.depth,
+            operators=arguments.operators,
+            leaf_probability=arguments.leaf_probability,
+            parentheses=arguments.parentheses,
+            negation=arguments.negation,
+            reuse=arguments.reuse,
+            live_variables=arguments.live_variables,
+            seed=arguments.seed,
+        )
+        results = benchmark(
+            shape, sizes_up_to(arguments.max_statements), arguments.opt_level
+        )
+        if arguments.save is not None:
+            with open(arguments.save, "w") as output:
+                json.dump(results, output, indent=2)
+        return
+
+    with open(arguments.baseline) as baseline_file:
+        baseline = json.load(baseline_file)
+    if arguments.current is not None:
+        with open(arguments.current) as current_file:
+            current = json.load(current_file)
+    else:
+        # Measured again with the shape, sizes and level of the baseline
+        current = benchmark(
+            ProgramShape(**baseline["shape"]),
+            list(measurements_by_size(baseline)),
+            baseline["opt_level"],
+        )
+        print()
+    sys.exit(1 if compare(baseline, current, arguments.threshold) else 0)
+
+
+if __name__ == "__main__":
+    main()
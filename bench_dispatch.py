@@ -0,0 +1,91 @@
+"""
+Measures the per-node cost of dispatching a visitor over a ~100k node AST,
+using functools.singledispatchmethod and dispatch.dispatchmethod.
+"""
+
+import time
+from functools import singledispatchmethod
+
+from lexing import Tokenizer, Identifier, Literal
+from parsing import Parser
+from ast_ import BinaryOperation, UnaryOperation, Assignment, Return, Decleration
+from dispatch import dispatchmethod
+
+STATEMENT = "a = a * 2 + -(a - 3) / 4;"
+
+
+def generate_program(nodes: int) -> str:
+    # Every statement has 11 AST nodes
+    statements = ["let a = 1;"] + [STATEMENT] * (nodes // 11) + ["return a;"]
+    return "\n".join(statements)
+
+
+def make_visitor(decorator):
+    class Visitor:
+        def __init__(self):
+            self.count = 0
+
+        @decorator
+        def visit(self, node):
+            raise TypeError(type(node))
+
+        @visit.register(Decleration)
+        def _(self, node):
+            self.count += 1
+            self.visit(node.expr)
+
+        @visit.register(Assignment)
+        def _(self, node):
+            self.count += 1
+            self.visit(node.src)
+
+        @visit.register(Return)
+        def _(self, node):
+            self.count += 1
+            self.visit(node.expr)
+
+        @visit.register(BinaryOperation)
+        def _(self, node):
+            self.count += 1
+            self.visit(node.lhs)
+            self.visit(node.rhs)
+
+        @visit.register(UnaryOperation)
+        def _(self, node):
+            self.count += 1
+            self.visit(node.operand)
+
+        @visit.register(Identifier)
+        @visit.register(Literal)
+        def _(self, node):
+            self.count += 1
+
+    return Visitor
+
+
+def measure(visitor_class, ast, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        visitor = visitor_class()
+        start = time.perf_counter()
+        for statement in ast:
+            visitor.visit(statement)
+        best = min(best, time.perf_counter() - start)
+    return best, visitor.count
+
+
+def main():
+    ast = Parser().parse(Tokenizer().tokenize(generate_program(100_000)))
+    for name, decorator in [
+        ("singledispatchmethod", singledispatchmethod),
+        ("dispatchmethod", dispatchmethod),
+    ]:
+        elapsed, nodes = measure(make_visitor(decorator), ast)
+        print(
+            f"{name:>20}: {nodes} nodes in {elapsed * 1e3:.1f}ms, "
+            f"{elapsed / nodes * 1e9:.0f}ns per node"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Startup time of main.py invocations, from python -X importtime.
+
+Every invocation runs in a new interpreter with bytecode caching enabled in
+a temporary directory, warmed up by a first run, like an installed compiler.
+
+    python bench_startup.py [--runs N] [--top N]
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Dict, List
+
+MAIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$")
+PROGRAM = "let a = 6; let b = a * 7; return b - 1;"
+
+
+@dataclass
+class ImportProfile:
+    wall_ms: float
+    # Cumulative import time of the modules imported at the top level
+    import_ms: float
+    # Self import time of every module imported, in microseconds
+    modules: Dict[str, int]
+
+
+def profile(args: List[str], cache_dir: str, cwd: str) -> ImportProfile:
+    environment = dict(os.environ)
+    environment.pop("PYTHONDONTWRITEBYTECODE", None)
+    command = [sys.executable, "-X", "importtime", "-X", f"pycache_prefix={cache_dir}"]
+    start = time.perf_counter()
+    child = subprocess.run(
+        command + [MAIN] + args,
+        cwd=cwd,
+        env=environment,
+        capture_output=True,
+        text=True,
+    )
+    wall = time.perf_counter() - start
+    modules = {}
+    total = 0
+    for line in child.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match is None:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        modules[name] = int(self_us)
+        if not indent:
+            total += int(cumulative_us)
+    return ImportProfile(wall * 1000, total / 1000, modules)
+
+
+def profile_runs(
+    args: List[str], cache_dir: str, cwd: str, runs: int
+) -> List[ImportProfile]:
+    # The first run fills the bytecode cache
+    profile(args, cache_dir, cwd)
+    return [profile(args, cache_dir, cwd) for _ in range(runs)]
+
+
+def bare_interpreter_ms(runs: int) -> float:
+    def run() -> float:
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"])
+        return (time.perf_counter() - start) * 1000
+
+    return statistics.median(run() for _ in range(runs))
+
+
+def scenarios(directory: str) -> Dict[str, List[str]]:
+    source = os.path.join(directory, "program.kal")
+    with open(source, "w") as output:
+        output.write(PROGRAM)
+    binary = os.path.join(directory, "a.out")
+    return {
+        "compile --backend native": [
+            "compile",
+            source,
+            "-o",
+            binary,
+            "--backend",
+            "native",
+        ],
+        "compile -O1 --backend native": [
+            "compile",
+            source,
+            "-O1",
+            "-o",
+            binary,
+            "--backend",
+            "native",
+        ],
+        "compile (gcc)": ["compile", source, "-o", binary],
+        "run --jit": ["run", "--jit", source],
+        "--help": ["--help"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=0, help="Slowest modules to list")
+    arguments = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        cache_dir = os.path.join(directory, "pycache")
+        print(f"{'invocation':<30} {'wall ms':>8} {'imports ms':>10} {'modules':>8}")
+        print(f"{'python -c pass':<30} {bare_interpreter_ms(arguments.runs):>8.1f}")
+        for name, args in scenarios(directory).items():
+            runs = profile_runs(args, cache_dir, directory, arguments.runs)
+            wall = statistics.median(run.wall_ms for run in runs)
+            imports = statistics.median(run.import_ms for run in runs)
+            print(f"{name:<30} {wall:>8.1f} {imports:>10.1f} {len(runs[0].modules):>8}")
+            slowest = sorted(runs[0].modules.items(), key=lambda item: -item[1])
+            for module, self_us in slowest[: arguments.top]:
+                print(f"    {module:<26} {self_us / 1000:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+import click
+import os
+import sys
+from typing import Optional
+
+from optimization import MAX_OPT_LEVEL
+import commands
+
+opt_level_option = click.option(
+    "-O",
+    "opt_level",
+    type=click.IntRange(0, MAX_OPT_LEVEL),
+    default=0,
+    show_default=True,
+)
+backend_option = click.option(
+    "--backend",
+    type=click.Choice(commands.BACKENDS),
+    default="gcc",
+    show_default=True,
+    help="Assemble and link with gcc, or write the executable directly",
+)
+
+
+@click.group()
+def main():
+    """Without a command, main.py PATH [OPTIONS] runs compile"""
+
+
+@main.command("compile")
+@click.argument("path")
+@click.option("-o", "--output", "bin_out", default="a.out")
+@opt_level_option
+@backend_option
+@click.option(
+    "--server",
+    "socket_path",
+    type=click.Path(dir_okay=False),
+    help="Compile on the compile server listening on this socket",
+)
+@click.option(
+    "--time-passes",
+    is_flag=True,
+    help="Print the time, peak memory and item counts of every pass to stderr",
+)
+@click.option(
+    "--stats-json",
+    type=click.Path(dir_okay=False, allow_dash=True),
+    help="Write the statistics of every pass as JSON to this file, - for stdout",
+)
+def compile_command(
+    path: str,
+    bin_out: str,
+    opt_level: int,
+    backend: str,
+    socket_path: Optional[str],
+    time_passes: bool,
+    stats_json: Optional[str],
+):
+    if socket_path is not None and (time_passes or stats_json is not None):
+        raise click.UsageError("Passes can't be measured when compiling on a server")
+    commands.compile_command(
+        path, bin_out, opt_level, backend, socket_path, time_passes, stats_json
+    )
+
+
+@main.command("serve")
+@click.option("--socket", "socket_path", default="kalkar.sock", show_default=True)
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(1),
+    default=os.cpu_count(),
+    show_default="CPU count",
+    help="Number of requests compiled at once",
+)
+def serve_command(socket_path: str, jobs: int):
+    """Serves compile requests on a Unix domain socket until interrupted"""
+    commands.serve_command(socket_path, jobs)
+
+
+@main.command("build")
+@click.argument("paths", nargs=-1, required=True)
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(1),
+    default=os.cpu_count(),
+    show_default="CPU count",
+    help="Number of worker processes",
+)
+@click.option(
+    "--output-dir",
+    type=click.Path(file_okay=False),
+    help="Where to write the executables, next to the sources by default",
+)
+@opt_level_option
+@backend_option
+def build_command(
+    paths, jobs: int, output_dir: Optional[str], opt_level: int, backend: str
+):
+    """Compiles many files at once, @FILE arguments list one path per line"""
+    sys.exit(commands.build_command(list(paths), jobs, output_dir, opt_level, backend))
+
+
+@main.command("run")
+@click.argument("path")
+@opt_level_option
+@click.option(
+    "--jit",
+    "use_jit",
+    is_flag=True,
+    help="Run in process instead of as a new executable",
+)
+def run_command(path: str, opt_level: int, use_jit: bool):
+    commands.run_command(path, opt_level, use_jit)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Client of the compile server. It only needs the standard library, so it
+starts without importing the compiler.
+"""
+
+import base64
+import json
+import socket
+from typing import List
+
+
+class RemoteCompilationError(Exception):
+    """A diagnostic returned by the server"""
+
+    def __init__(self, diagnostic: dict):
+        super().__init__(diagnostic.get("text", diagnostic["message"]))
+        self.diagnostic = diagnostic
+
+
+class CompileClient:
+    def __init__(self, socket_path: str):
+        self.connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.connection.connect(socket_path)
+        self.stream = self.connection.makefile("rwb")
+
+    def request(self, request: dict) -> dict:
+        self.stream.write(json.dumps(request).encode() + b"\n")
+        self.stream.flush()
+        line = self.stream.readline()
+        if not line:
+            raise ConnectionError("The compile server closed the connection")
+        response = json.loads(line)
+        if not response["ok"]:
+            raise RemoteCompilationError(response["error"])
+        return response
+
+    def compile(self, source: str, opt_level: int = 0) -> List[str]:
+        """Assembly lines of source"""
+        request = {"source": source, "opt_level": opt_level, "output": "assembly"}
+        return self.request(request)["assembly"]
+
+    def compile_executable(self, source: str, opt_level: int = 0) -> bytes:
+        """Executable of source, linked by the native backend"""
+        request = {"source": source, "opt_level": opt_level, "output": "binary"}
+        return base64.b64decode(self.request(request)["binary"])
+
+    def stats(self) -> dict:
+        return self.request({"command": "stats"})["stats"]
+
+    def close(self):
+        try:
+            self.stream.close()
+        except OSError:
+            # A request left unsent on a connection the server closed
+            pass
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
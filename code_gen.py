@@ -1,24 +1,49 @@
-from typing import Dict
-from functools import singledispatchmethod
-from itertools import cycle
+from typing import Dict, List
 
-from ir import LoadConstant, LoadVariable, BinaryOperation, UnaryOperation, Return
-
-
-class Variable:
-    def __init__(self):
-        self.stack_pos = None
-        self.reg = None
+from ir import LoadConstant, LoadVariable, BinaryOperation, Negate, Return
+from liveness import live_intervals
+from register_allocation import LinearScanAllocator
+from instruction_selection import (
+    is_memory,
+    fits_int32,
+    sized,
+    multiply_by_constant,
+    divide_by_constant,
+)
+from dispatch import dispatchmethod
 
 
 class CodeGen:
     STACK_ALIGNMENT = 0x10
+    # Caller-saved registers come first, so callee-saved ones are only pushed
+    # when needed. rax is never allocated: it is the fixed operand of idiv,
+    # and the scratch register for memory to memory operations.
+    ALLOCATABLE_REGISTERS = [
+        "rcx",
+        "rsi",
+        "rdi",
+        "r8",
+        "r9",
+        "r10",
+        "r11",
+        "rdx",
+        "rbx",
+        "r12",
+        "r13",
+        "r14",
+        "r15",
+    ]
+    CALLEE_SAVED_REGISTERS = ["rbx", "r12", "r13", "r14", "r15"]
     PROLOGUE = [
         ".global main",
         "main:",
         "push %rbp",
         "mov  %rsp, %rbp",
     ]
+    RETURN = [
+        "mov $0, %rax",
+        "ret",
+    ]
     EPILOGUE = [
         ".section .rodata",
         "format:",
@@ -27,102 +52,173 @@ class CodeGen:
 
     def __init__(self):
         self.output = []
-        self.variables: Dict[str, Variable] = {}
-        self.regs: Dict[str, Variable] = {}
-        self.reg_cycle = iter(cycle(["rax", "rbx"]))
+        self.registers: Dict[str, str] = {}
+        self.saved_registers: List[str] = []
+        # Values defined by LoadConstant
+        self.constants: Dict[str, int] = {}
+        # Constants used as immediate operands instead of being loaded
+        self.immediates: Dict[str, str] = {}
+        self.stack_slots: Dict[str, int] = {}
+        self.free_stack_slots: List[int] = []
+        # Spilled values by the index of their last use
+        self.slot_releases: Dict[int, List[str]] = {}
         self.stack_top = 0
+        self.spills = 0
+        self.live_stack_slots = 0
+        self.peak_stack_slots = 0
 
     def code_gen(self, ir):
-        for instruction in ir:
+        self.allocate_registers(ir)
+        for index, instruction in enumerate(ir):
             self.compile_instruction(instruction)
+            self.release_stack_slots(index)
         self.align_stack()
         total = self.PROLOGUE.copy()
+        total.extend(f"push %{reg}" for reg in self.saved_registers)
         if self.stack_top != 0:
             total.append(f"sub ${self.stack_top}, %rsp")
         total.extend(self.output)
         total.extend(self.EPILOGUE)
         return total
 
-    @singledispatchmethod
-    def compile_instruction(self, instrcution):
-        raise TypeError(f"Unknown instruction: {instrcution}")
-
-    @compile_instruction.register
-    def compile_load_const(self, load: LoadConstant):
-        reg = self.get_reg()
-        self.output.append(f"mov ${load.value}, %{reg}")
-        var = self.get_var(load.dest)
-        self.regs[reg] = var
-        var.reg = reg
-
-    @compile_instruction.register
-    def compile_load_var(self, load: LoadVariable):
-        source = self.get_var(load.source)
-        reg = self.get_reg()
-        if source.reg is not None:
-            self.output.append(f"mov %{source.reg}, %{reg}")
-        else:
-            self.output.append(f"mov {source.stack_pos}(%rsp), %{reg}")
-        dest = self.get_var(load.dest)
-        self.regs[reg] = dest
-        dest.reg = reg
+    def allocate_registers(self, ir):
+        self.constants = {
+            instruction.dest: instruction.value
+            for instruction in ir
+            if type(instruction) is LoadConstant
+        }
+        self.immediates = {
+            value: f"${self.constants[value]}" for value in self.immediate_constants(ir)
+        }
+        # Divisions leave the upper half of the dividend or product in rdx
+        rdx_clobbers = [
+            index
+            for index, instruction in enumerate(ir)
+            if type(instruction) is BinaryOperation
+            and instruction.op == "/"
+            and self.constants.get(instruction.rhs) != 1
+        ]
+        allocator = LinearScanAllocator(
+            self.ALLOCATABLE_REGISTERS, clobbers={"rdx": rdx_clobbers}
+        )
+        intervals = [
+            interval
+            for interval in live_intervals(ir)
+            if interval.value not in self.immediates
+        ]
+        self.registers = allocator.allocate(intervals, self.coalescing_hints(ir))
+        self.spills = len(allocator.spilled)
+        for interval in intervals:
+            if interval.value in allocator.spilled:
+                self.slot_releases.setdefault(interval.end, []).append(interval.value)
+        used = set(self.registers.values())
+        self.saved_registers = [
+            reg for reg in self.CALLEE_SAVED_REGISTERS if reg in used
+        ]
 
-    def get_var(self, var_name: str) -> Variable:
-        return self.variables.setdefault(var_name, Variable())
+    def immediate_constants(self, ir) -> List[str]:
+        """Constants whose every use accepts a 32 bit immediate"""
+        register_only = set()
+        for instruction in ir:
+            if type(instruction) is BinaryOperation and instruction.op == "/":
+                # idiv and the magic multiply take no immediates
+                register_only.add(instruction.lhs)
+                if self.constants.get(instruction.rhs) in (0, -1):
+                    register_only.add(instruction.rhs)
+        return [
+            value
+            for value, constant in self.constants.items()
+            if fits_int32(constant) and value not in register_only
+        ]
 
-    def get_reg(self, exclude_reg=None) -> str:
-        while (reg := next(self.reg_cycle)) == exclude_reg:
-            pass
-        self.assure_register_is_free(reg)
-        return reg
+    @staticmethod
+    def coalescing_hints(ir) -> Dict[str, str]:
+        """Values that should share a register with their source"""
+        hints = {}
+        for instruction in ir:
+            if type(instruction) in (LoadVariable, Negate):
+                hints[instruction.dest] = instruction.source
+            elif type(instruction) is BinaryOperation and instruction.op in "+-*":
+                hints[instruction.dest] = instruction.lhs
+        return hints
 
-    def assure_register_is_free(self, reg):
-        """Stores the variable who's using the register"""
+    def location(self, var_name: str) -> str:
         try:
-            var = self.regs[reg]
+            return f"%{self.registers[var_name]}"
         except KeyError:
-            return
-        self.store(var)
-        self.free_reg(var.reg)
-
-    def store(self, var: Variable):
-        if var.stack_pos is None:
-            var.stack_pos = self.alloc_stack()
-        self.output.append(f"mov %{var.reg}, {var.stack_pos}(%rsp)")
+            pass
+        if var_name in self.immediates:
+            return self.immediates[var_name]
+        if var_name not in self.stack_slots:
+            self.stack_slots[var_name] = self.alloc_stack()
+        return f"{self.stack_slots[var_name]}(%rsp)"
 
     def alloc_stack(self):
+        self.live_stack_slots += 1
+        self.peak_stack_slots = max(self.peak_stack_slots, self.live_stack_slots)
+        if self.free_stack_slots:
+            return self.free_stack_slots.pop()
         pos = self.stack_top
         self.stack_top += 8
         return pos
 
-    def free_reg(self, reg: str):
-        if reg not in self.regs:
+    def release_stack_slots(self, index: int):
+        """Returns the slots of spilled values last used at index"""
+        for var_name in self.slot_releases.pop(index, []):
+            self.free_stack_slots.append(self.stack_slots[var_name])
+            self.live_stack_slots -= 1
+
+    def frame_report(self) -> Dict[str, int]:
+        return {
+            "frame_bytes": self.stack_top + 8 * len(self.saved_registers),
+            "spilled_values": self.spills,
+            "stack_slots": self.peak_stack_slots,
+            "saved_registers": len(self.saved_registers),
+        }
+
+    def move(self, source: str, dest: str):
+        if source == dest:
+            return
+        if is_memory(source) and is_memory(dest):
+            self.output.append(f"mov {source}, %rax")
+            source = "%rax"
+        if source.startswith("$") and is_memory(dest):
+            self.output.append(f"movq {source}, {dest}")
+        else:
+            self.output.append(f"mov {source}, {dest}")
+
+    @dispatchmethod
+    def compile_instruction(self, instrcution):
+        raise TypeError(f"Unknown instruction: {instrcution}")
+
+    @compile_instruction.register
+    def compile_load_const(self, load: LoadConstant):
+        if load.dest in self.immediates:
             return
-        self.regs[reg].reg = None
-        self.regs.pop(reg)
+        dest = self.location(load.dest)
+        if is_memory(dest) and not fits_int32(load.value):
+            self.output.append(f"mov ${load.value}, %rax")
+            self.move("%rax", dest)
+        elif is_memory(dest):
+            self.output.append(f"movq ${load.value}, {dest}")
+        else:
+            self.output.append(f"mov ${load.value}, {dest}")
 
     @compile_instruction.register
-    def compile_unary_op(self, operation: UnaryOperation):
-        assert operation.op == "-"
-        var = self.load_backup(operation.var)
-        self.output.append(f"neg %{var.reg}")
-
-    def load_backup(self, var_name, exclude_reg=None):
-        var = self.get_var(var_name)
-        if var.reg is None:
-            self.load(var_name, exclude_reg)
+    def compile_load_var(self, load: LoadVariable):
+        self.move(self.location(load.source), self.location(load.dest))
+
+    @compile_instruction.register
+    def compile_negate(self, negate: Negate):
+        source = self.location(negate.source)
+        dest = self.location(negate.dest)
+        if is_memory(dest):
+            self.move(source, "%rax")
+            self.output.append("neg %rax")
+            self.move("%rax", dest)
         else:
-            self.store(var)
-        return var
-
-    def load(self, var_name: str, exclude_reg=None) -> Variable:
-        var = self.get_var(var_name)
-        if var.reg is None:
-            reg = self.get_reg(exclude_reg)
-            self.output.append(f"mov {var.stack_pos}(%rsp), %{reg}")
-            self.regs[reg] = var
-            var.reg = reg
-        return var
+            self.move(source, dest)
+            self.output.append(f"neg {dest}")
 
     @compile_instruction.register
     def compile_binary_op(self, operation: BinaryOperation):
@@ -132,70 +228,117 @@ class CodeGen:
             "*": self.compile_mul,
             "/": self.compile_div,
         }[operation.op]
-        lhs = self.load_backup(operation.lhs)
-        rhs = self.load(operation.rhs, exclude_reg=lhs.reg)
-        output_reg = operation_compiler(lhs, rhs)
-        output_var = self.get_var(operation.dest)
-        output_var.reg = output_reg
-        self.regs[output_reg] = output_var
-
-    def compile_add(self, lhs: Variable, rhs: Variable):
-        self.output.append(f"add %{rhs.reg}, %{lhs.reg}")
-        return lhs.reg
-
-    def compile_sub(self, lhs: Variable, rhs: Variable):
-        self.output.append(f"sub %{rhs.reg}, %{lhs.reg}")
-        return lhs.reg
-
-    def compile_mul(self, lhs: Variable, rhs: Variable):
-        self.assure_variable_in_reg(lhs, "rax")
-        self.output.extend(
-            [
-                "cqo",
-                f"mul %{rhs.reg}",
-            ]
+        operation_compiler(operation)
+
+    def locations(self, operation: BinaryOperation):
+        return (
+            self.location(operation.dest),
+            self.location(operation.lhs),
+            self.location(operation.rhs),
         )
-        return "rax"
 
-    def assure_variable_in_reg(self, var: Variable, reg: str):
-        if var.reg == reg:
+    def compile_add(self, operation: BinaryOperation):
+        dest, lhs, rhs = self.locations(operation)
+        if dest == rhs and not is_memory(dest):
+            # Addition is commutative, add straight into the register of rhs
+            self.output.append(f"add {lhs}, {dest}")
+        elif lhs.startswith("$") and not rhs.startswith("$"):
+            self.compile_two_operand("add", dest, rhs, lhs)
+        else:
+            self.compile_two_operand("add", dest, lhs, rhs)
+
+    def compile_sub(self, operation: BinaryOperation):
+        self.compile_two_operand("sub", *self.locations(operation))
+
+    def compile_two_operand(self, mnemonic: str, dest: str, lhs: str, rhs: str):
+        """Computes dest = lhs <op> rhs with a two operand instruction"""
+        if is_memory(dest) or (dest == rhs and dest != lhs):
+            self.move(lhs, "%rax")
+            self.output.append(f"{mnemonic} {rhs}, %rax")
+            self.move("%rax", dest)
+        else:
+            self.move(lhs, dest)
+            self.output.append(f"{mnemonic} {rhs}, {dest}")
+
+    def compile_mul(self, operation: BinaryOperation):
+        dest, lhs, rhs = self.locations(operation)
+        lhs_constant = self.constants.get(operation.lhs)
+        rhs_constant = self.constants.get(operation.rhs)
+        if rhs_constant is None and lhs_constant is not None:
+            # Multiplication is commutative, keep the constant on the right
+            lhs, rhs, rhs_constant = rhs, lhs, lhs_constant
+        result = "%rax" if is_memory(dest) else dest
+        if lhs.startswith("$") and not rhs.startswith("$"):
+            # Both operands are constants but only lhs fits in an immediate,
+            # the wide rhs may already be in result
+            self.output.append(f"imul {lhs}, {rhs}, {result}")
+            self.move(result, dest)
             return
-        try:
-            switched = self.regs[reg]
-            self.output.append(f"xchg %{var.reg}, %{reg}")
-            switched.reg = var.reg
-            self.regs[var.reg] = switched
-        except KeyError:
-            self.output.append(f"mov %{var.reg}, %{reg}")
-        var.reg = reg
-        self.regs[reg] = var
+        if lhs.startswith("$"):
+            self.move(lhs, result)
+            lhs = result
+        lines = None
+        if rhs_constant is not None:
+            lines = multiply_by_constant(result, lhs, rhs_constant)
+        if lines is not None:
+            self.output.extend(lines)
+        elif result == rhs and result != lhs:
+            self.output.append(f"imul {lhs}, {result}")
+        else:
+            self.move(lhs, result)
+            self.output.append(f"imul {rhs}, {result}")
+        self.move(result, dest)
 
-    def compile_div(self, lhs: Variable, rhs: Variable):
-        self.assure_variable_in_reg(lhs, "rax")
-        self.output.extend(
-            [
-                "cqo",
-                f"idiv %{rhs.reg}",
-            ]
-        )
-        return "rax"
+    def compile_div(self, operation: BinaryOperation):
+        dest, lhs, rhs = self.locations(operation)
+        divisor = self.constants.get(operation.rhs)
+        if divisor == 1:
+            self.move(lhs, dest)
+            return
+        # Keep idiv for divisions that trap
+        if divisor is not None and divisor not in (0, -1):
+            self.output.extend(divide_by_constant(lhs, divisor))
+        else:
+            self.move(lhs, "%rax")
+            self.output.extend(
+                [
+                    "cqo",
+                    f"{sized('idiv', rhs)} {rhs}",
+                ]
+            )
+        self.move("%rax", dest)
 
     @compile_instruction.register
     def compile_return(self, ret: Return):
-        var = self.load(ret.var)
+        self.return_value(self.location(ret.var))
+        self.output.extend(self.frame_exit())
+        self.output.extend(self.RETURN)
+
+    def return_value(self, location: str):
+        """Prints the value, main itself returns 0"""
+        self.move(location, "%rsi")
         self.output.extend(
             [
-                f"mov %{var.reg}, %rsi",
                 "lea  format(%rip), %rdi",
+                "mov $0, %eax",
                 "call printf",
-                "mov %rbp, %rsp",
-                "pop %rbp",
-                "mov $0, %rax",
-                "ret",
             ]
         )
 
+    def frame_exit(self) -> List[str]:
+        """Restores the callee-saved registers, rsp and rbp"""
+        if self.saved_registers:
+            lines = [f"lea -{8 * len(self.saved_registers)}(%rbp), %rsp"]
+            lines.extend(f"pop %{reg}" for reg in reversed(self.saved_registers))
+        else:
+            lines = ["mov %rbp, %rsp"]
+        lines.append("pop %rbp")
+        return lines
+
     def align_stack(self):
-        self.stack_top = (self.stack_top + (self.STACK_ALIGNMENT - 1)) & ~(
-            self.STACK_ALIGNMENT - 1
-        )
+        # The pushed callee-saved registers are part of the frame too
+        pushed = 8 * len(self.saved_registers)
+        self.stack_top = (
+            (self.stack_top + pushed + (self.STACK_ALIGNMENT - 1))
+            & ~(self.STACK_ALIGNMENT - 1)
+        ) - pushed
@@ -0,0 +1,157 @@
+"""
+What the command line commands do, shared by the click CLI and the fast path
+of main.py. Modules are imported by the commands needing them, so that an
+invocation only pays for what it uses.
+"""
+
+import os
+import sys
+from typing import List, Optional
+
+BACKENDS = ["gcc", "native"]
+
+
+def compile_command(
+    path: str,
+    bin_out: str,
+    opt_level: int,
+    backend: str,
+    socket_path: Optional[str] = None,
+    time_passes: bool = False,
+    stats_json: Optional[str] = None,
+):
+    from errors import CompilationError
+    from gcc import LinkError
+    from instrumentation import Instrumentation
+
+    measuring = time_passes or stats_json is not None
+    # Timed untraced, see Instrumentation
+    instrumentation = Instrumentation(enabled=measuring, trace_memory=False)
+
+    if socket_path is not None:
+        from client import RemoteCompilationError
+
+        remote_errors = (RemoteCompilationError,)
+    else:
+        remote_errors = ()
+    try:
+        if socket_path is not None:
+            compile_remotely(socket_path, path, bin_out, opt_level, backend)
+        else:
+            from driver import compile_file
+
+            compile_file(path, bin_out, opt_level, backend, instrumentation)
+            if measuring:
+                traced = Instrumentation(trace_memory=True)
+                compile_file(path, bin_out, opt_level, backend, traced)
+                instrumentation.add_peak_bytes(traced)
+    except (CompilationError, *remote_errors) as e:
+        print(f'Error compiling "{path}":\n{e}', file=sys.stderr)
+    except LinkError as e:
+        print(e, file=sys.stderr)
+    # Reported on errors too, with the passes that ran
+    if time_passes:
+        print(instrumentation.table(), file=sys.stderr)
+    if stats_json is not None:
+        write_stats_json(instrumentation, stats_json)
+
+
+def write_stats_json(instrumentation, path: str):
+    """Writes the statistics of a compilation to path, or stdout for -"""
+    import json
+
+    if path == "-":
+        json.dump(instrumentation.to_json(), sys.stdout, indent=2)
+        print()
+        return
+    with open(path, "w") as output:
+        json.dump(instrumentation.to_json(), output, indent=2)
+
+
+def compile_remotely(
+    socket_path: str, path: str, bin_out: str, opt_level: int, backend: str
+):
+    from client import CompileClient
+    from gcc import link_with_gcc
+
+    with open(path) as source_file:
+        source = source_file.read()
+    with CompileClient(socket_path) as client:
+        if backend == "native":
+            with open(bin_out, "wb") as output:
+                output.write(client.compile_executable(source, opt_level))
+            os.chmod(bin_out, 0o755)
+            return
+        instructions = client.compile(source, opt_level)
+    link_with_gcc(instructions, bin_out)
+
+
+def serve_command(socket_path: str, jobs: int):
+    import signal
+    from server import CompileServer
+
+    server = CompileServer(socket_path, jobs)
+    # Shut down cleanly when stopped by a service manager too
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    print(f"Listening on {socket_path}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+
+
+def build_command(
+    paths: List[str], jobs: int, output_dir: Optional[str], opt_level: int, backend: str
+) -> int:
+    """Returns the exit status, 1 if any file failed to build"""
+    from driver import BuildJob, build, expand_manifests, output_path
+
+    paths = expand_manifests(paths)
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+    results = build(
+        [
+            BuildJob(path, output_path(path, output_dir), opt_level, backend)
+            for path in paths
+        ],
+        jobs,
+    )
+    failed = [result for result in results if result.error is not None]
+    for result in failed:
+        print(result.error, file=sys.stderr)
+    print(f"Built {len(results) - len(failed)} of {len(results)} files")
+    return 1 if failed else 0
+
+
+def run_command(path: str, opt_level: int, use_jit: bool):
+    import subprocess
+    import tempfile
+    from source import Source
+    from compiler import compile_source
+    from errors import CompilationError
+    from driver import write_executable
+    from gcc import LinkError
+
+    try:
+        if use_jit:
+            import jit
+            from assembler import AssemblerError
+
+            try:
+                print(jit.run(Source.from_path(path), opt_level))
+            except AssemblerError as e:
+                print(f'Error assembling "{path}": {e}', file=sys.stderr)
+            return
+        instructions = compile_source(Source.from_path(path), opt_level)
+        with tempfile.TemporaryDirectory() as directory:
+            bin_out = os.path.join(directory, "a.out")
+            write_executable(instructions, bin_out)
+            subprocess.run([bin_out])
+    except CompilationError as e:
+        print(f'Error compiling "{path}":\n{e}', file=sys.stderr)
+    except ZeroDivisionError as e:
+        print(f'Error running "{path}": {e}', file=sys.stderr)
+    except LinkError as e:
+        print(e, file=sys.stderr)
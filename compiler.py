@@ -0,0 +1,69 @@
+from typing import Dict, List, Optional, Union
+
+from lexing import Tokenizer
+from source import Source
+from parsing import Parser
+from semantic_analysis import SemanticAnalyzer
+from ast_lowering import LoweringPass
+from optimization import optimize, optimize_assembly
+from ir import verify
+from code_gen import CodeGen
+from instrumentation import Instrumentation, count_nodes
+
+# Inputs larger than this are lexed lazily while parsing, instead of being
+# tokenized up front
+STREAMING_THRESHOLD = 1 << 16
+
+
+def compile_source(
+    content: Union[str, Source],
+    opt_level: int = 0,
+    statistics: Optional[Dict[str, int]] = None,
+    code_gen: Optional[CodeGen] = None,
+    instrumentation: Optional[Instrumentation] = None,
+    streaming: Optional[bool] = None,
+) -> List[str]:
+    """
+    Compiles a program to assembly lines, raising CompilationError on errors.
+    Sources are lexed while parsing if streaming, by default if they are
+    larger than STREAMING_THRESHOLD.
+    """
+    if code_gen is None:
+        code_gen = CodeGen()
+    if instrumentation is None:
+        instrumentation = Instrumentation(enabled=False)
+    if statistics is None:
+        statistics = instrumentation.statistics
+    run = instrumentation.run
+    if streaming is None:
+        streaming = len(content) > STREAMING_THRESHOLD
+    if streaming:
+        # Lexing happens as the parser pulls tokens, it is timed with parsing
+        tokens = Tokenizer().stream(content)
+        ast = run(
+            "lex+parse",
+            lambda: Parser().parse(tokens),
+            tokens=lambda _: tokens.popped,
+            nodes=count_nodes,
+        )
+    else:
+        tokens = run(
+            "lex",
+            lambda: Tokenizer().tokenize(content),
+            tokens=lambda stream: len(stream.tokens),
+        )
+        ast = run("parse", lambda: Parser().parse(tokens), nodes=count_nodes)
+    run("analyze", lambda: SemanticAnalyzer().analyze(ast))
+    ir = run("lower", lambda: LoweringPass().lower(ast), instructions=len)
+    ir = run("optimize", lambda: optimize(ir, opt_level, statistics), instructions=len)
+    run("verify", lambda: verify(ir))
+    lines = run(
+        "codegen",
+        lambda: code_gen.code_gen(ir),
+        lines=len,
+        spills=lambda _: code_gen.spills,
+        stack_bytes=lambda _: code_gen.frame_report()["frame_bytes"],
+    )
+    return run(
+        "peephole", lambda: optimize_assembly(lines, opt_level, statistics), lines=len
+    )
@@ -0,0 +1,113 @@
+from typing import Dict, Optional, Set
+
+from ir import LoadConstant, LoadVariable, Negate, BinaryOperation, Return
+from dispatch import dispatchmethod
+
+INT64_BITS = 64
+
+
+def wrap_int64(value: int) -> int:
+    """Wraps around like a 64 bit register would"""
+    value &= (1 << INT64_BITS) - 1
+    if value >> (INT64_BITS - 1):
+        value -= 1 << INT64_BITS
+    return value
+
+
+def truncating_division(lhs: int, rhs: int) -> Optional[int]:
+    """
+    Divides like idiv, rounding towards zero.
+    Returns None for divisions that trap at runtime, so they are left as is.
+    """
+    if rhs == 0 or (lhs == -(1 << (INT64_BITS - 1)) and rhs == -1):
+        return None
+    quotient = abs(lhs) // abs(rhs)
+    return quotient if (lhs < 0) == (rhs < 0) else -quotient
+
+
+class ConstantFoldingPass:
+    """
+    Evaluates operations on known values at compile time.
+    A known value is only materialized with a LoadConstant right before an
+    instruction that can't be folded uses it.
+    """
+
+    EVALUATORS = {
+        "+": lambda lhs, rhs: lhs + rhs,
+        "-": lambda lhs, rhs: lhs - rhs,
+        "*": lambda lhs, rhs: lhs * rhs,
+        "/": truncating_division,
+    }
+
+    def __init__(self):
+        self.ir = []
+        self.constants: Dict[str, int] = {}
+        self.materialized: Set[str] = set()
+
+    def fold(self, ir: list):
+        for instruction in ir:
+            self.fold_once(instruction)
+        return self.ir
+
+    @dispatchmethod
+    def fold_once(self, instruction):
+        raise TypeError(f"No folding implemented for {type(instruction)}")
+
+    @fold_once.register
+    def fold_load_const(self, load: LoadConstant):
+        self.define(load.dest, load.value)
+
+    @fold_once.register
+    def fold_load_var(self, load: LoadVariable):
+        if load.source in self.constants:
+            self.define(load.dest, self.constants[load.source])
+        else:
+            self.emit(load)
+
+    @fold_once.register
+    def fold_negate(self, negate: Negate):
+        if negate.source in self.constants:
+            self.define(negate.dest, -self.constants[negate.source])
+        else:
+            self.emit(negate)
+
+    @fold_once.register
+    def fold_binary_op(self, operation: BinaryOperation):
+        lhs = self.constants.get(operation.lhs)
+        rhs = self.constants.get(operation.rhs)
+        if lhs is not None and rhs is not None:
+            value = self.EVALUATORS[operation.op](lhs, rhs)
+            if value is not None:
+                self.define(operation.dest, value)
+                return
+        simplified = self.simplify(operation, lhs, rhs)
+        if type(simplified) is LoadConstant:
+            self.define(simplified.dest, simplified.value)
+        else:
+            self.emit(simplified)
+
+    @staticmethod
+    def simplify(operation: BinaryOperation, lhs: Optional[int], rhs: Optional[int]):
+        """Applies algebraic identities where one side is known"""
+        op = operation.op
+        if op in "+-" and rhs == 0 or op in "*/" and rhs == 1:
+            return LoadVariable(operation.dest, operation.lhs)
+        if op == "+" and lhs == 0 or op == "*" and lhs == 1:
+            return LoadVariable(operation.dest, operation.rhs)
+        if op == "*" and 0 in (lhs, rhs):
+            return LoadConstant(operation.dest, 0)
+        return operation
+
+    @fold_once.register
+    def fold_return(self, ret: Return):
+        self.emit(ret)
+
+    def emit(self, instruction):
+        for operand in instruction.operands:
+            if operand in self.constants and operand not in self.materialized:
+                self.ir.append(LoadConstant(operand, self.constants[operand]))
+                self.materialized.add(operand)
+        self.ir.append(instruction)
+
+    def define(self, value: str, constant: int):
+        self.constants[value] = wrap_int64(constant)
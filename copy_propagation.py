@@ -0,0 +1,29 @@
+from typing import Dict
+
+from ir import LoadVariable
+
+
+class CopyPropagation:
+    """
+    Drops every LoadVariable and points the uses of the copy at the original
+    value. This is always safe, values are never redefined.
+    """
+
+    def __init__(self):
+        self.sources: Dict[str, str] = {}
+        self.eliminated = 0
+
+    def propagate(self, ir: list) -> list:
+        propagated = []
+        for instruction in ir:
+            instruction = instruction.map_operands(self.source_of)
+            if type(instruction) is LoadVariable:
+                self.sources[instruction.dest] = instruction.source
+                self.eliminated += 1
+                continue
+            propagated.append(instruction)
+        return propagated
+
+    def source_of(self, value: str) -> str:
+        # Sources are resolved when the copy is dropped, so one lookup is enough
+        return self.sources.get(value, value)
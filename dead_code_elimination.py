@@ -0,0 +1,39 @@
+from typing import Dict
+
+from ir import Return
+
+
+class DeadCodeElimination:
+    """
+    Drops instructions after the first Return, and instructions defining
+    values that are never used, found by a single backwards liveness pass.
+    Every instruction but Return is free of side effects, a dead division by
+    zero is dropped like any other dead instruction.
+    """
+
+    def __init__(self):
+        self.unreachable = 0
+        self.dead = 0
+
+    def eliminate(self, ir: list) -> list:
+        for index, instruction in enumerate(ir):
+            if type(instruction) is Return:
+                self.unreachable = len(ir) - index - 1
+                ir = ir[: index + 1]
+                break
+        live = set()
+        kept = []
+        for instruction in reversed(ir):
+            if instruction.dest is not None and instruction.dest not in live:
+                self.dead += 1
+                continue
+            live.update(instruction.operands)
+            kept.append(instruction)
+        kept.reverse()
+        return kept
+
+    def statistics(self) -> Dict[str, int]:
+        return {
+            "dce.unreachable": self.unreachable,
+            "dce.dead": self.dead,
+        }
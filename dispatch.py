@@ -0,0 +1,61 @@
+import inspect
+from types import MethodType
+from typing import get_type_hints
+
+
+class dispatchmethod:
+    """
+    Registration compatible replacement for functools.singledispatchmethod.
+    Handlers are looked up in a dict keyed by the exact type of the first
+    argument, the MRO is only walked the first time a type is seen.
+    """
+
+    def __init__(self, default):
+        self.default = default
+        self.registry = {}
+        self.handlers = {}
+        self.__doc__ = default.__doc__
+        self.__name__ = default.__name__
+
+    def register(self, cls, method=None):
+        if method is None:
+            if isinstance(cls, type):
+                return lambda method: self.register(cls, method)
+            method, cls = cls, self._dispatched_type(cls)
+        self.registry[cls] = method
+        self.handlers = dict(self.registry)
+        return method
+
+    @staticmethod
+    def _dispatched_type(method) -> type:
+        parameters = list(inspect.signature(method).parameters)
+        if len(parameters) < 2:
+            raise TypeError(f"Can't infer the dispatched type of {method}")
+        cls = get_type_hints(method).get(parameters[1])
+        if not isinstance(cls, type):
+            raise TypeError(f"Invalid annotation for {parameters[1]} in {method}")
+        return cls
+
+    def dispatch(self, cls: type):
+        try:
+            return self.handlers[cls]
+        except KeyError:
+            pass
+        handler = next(
+            (self.registry[base] for base in cls.__mro__ if base in self.registry),
+            self.default,
+        )
+        self.handlers[cls] = handler
+        return handler
+
+    def __call__(self, instance, arg, *args, **kwargs):
+        try:
+            handler = self.handlers[type(arg)]
+        except KeyError:
+            handler = self.dispatch(type(arg))
+        return handler(instance, arg, *args, **kwargs)
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        return MethodType(self, instance)
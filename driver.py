@@ -0,0 +1,115 @@
+"""
+Compiles source files to executables, one at a time or many in parallel.
+"""
+
+import os
+from dataclasses import dataclass
+from typing import Iterable, List, Optional
+
+from source import Source
+from compiler import compile_source
+from errors import CompilationError
+from gcc import LinkError, link_with_gcc
+from instrumentation import Instrumentation
+
+# Files handed to a worker at once, amortizing the cost of a round trip
+CHUNK_SIZE = 16
+
+
+@dataclass
+class BuildJob:
+    path: str
+    bin_out: str
+    opt_level: int = 0
+    backend: str = "gcc"
+
+
+@dataclass
+class BuildResult:
+    path: str
+    # Why the file failed to build, None if it built
+    error: Optional[str] = None
+
+
+def compile_file(
+    path: str,
+    bin_out: str,
+    opt_level: int = 0,
+    backend: str = "gcc",
+    instrumentation: Optional[Instrumentation] = None,
+):
+    """Compiles path to the executable bin_out, raising CompilationError on errors"""
+    if instrumentation is None:
+        instrumentation = Instrumentation(enabled=False)
+    source = instrumentation.run("read", lambda: Source.from_path(path), bytes=len)
+    instructions = compile_source(source, opt_level, instrumentation=instrumentation)
+    link = write_executable if backend == "native" else link_with_gcc
+    instrumentation.run(
+        f"link ({backend})",
+        lambda: link(instructions, bin_out),
+        bytes=lambda _: os.path.getsize(bin_out),
+    )
+
+
+def write_executable(instructions: List[str], bin_out: str):
+    # Not imported with the module, the gcc backend doesn't need it
+    from assembler import AssemblerError
+    from native import link_executable
+
+    try:
+        executable = link_executable(instructions)
+    except AssemblerError as e:
+        # Reported like gcc failing to assemble
+        raise LinkError(f"Error assembling: {e}") from None
+    with open(bin_out, "wb") as output:
+        output.write(executable)
+    os.chmod(bin_out, 0o755)
+
+
+def run_job(job: BuildJob) -> BuildResult:
+    # Errors are returned formatted, they hold sources that can't be pickled
+    try:
+        compile_file(job.path, job.bin_out, job.opt_level, job.backend)
+    except CompilationError as e:
+        return BuildResult(job.path, f'Error compiling "{job.path}":\n{e}')
+    except (OSError, UnicodeDecodeError) as e:
+        return BuildResult(job.path, f'Error reading "{job.path}": {e}')
+    except LinkError as e:
+        return BuildResult(job.path, f'Error linking "{job.path}":\n{e}')
+    return BuildResult(job.path)
+
+
+def build(jobs: List[BuildJob], workers: int = 1) -> List[BuildResult]:
+    """Runs the jobs on a pool of workers processes, in order of the jobs"""
+    if workers == 1 or len(jobs) <= 1:
+        return [run_job(job) for job in jobs]
+    # Importing it starts up multiprocessing, which single files don't need
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(run_job, jobs, chunksize=CHUNK_SIZE))
+
+
+def output_path(path: str, output_dir: Optional[str]) -> str:
+    """The executable of path: its name without extension, in output_dir if given"""
+    bin_out = os.path.splitext(path)[0]
+    if output_dir is not None:
+        bin_out = os.path.join(output_dir, os.path.basename(bin_out))
+    return bin_out
+
+
+def expand_manifests(arguments: Iterable[str]) -> List[str]:
+    """Replaces @manifest arguments by the paths listed in the file, one per line"""
+    paths = []
+    for argument in arguments:
+        if not argument.startswith("@"):
+            paths.append(argument)
+            continue
+        manifest = argument[1:]
+        directory = os.path.dirname(manifest)
+        with open(manifest) as lines:
+            for line in lines:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    paths.append(os.path.join(directory, line))
+    return paths
@@ -0,0 +1,23 @@
+"""
+Assembling and linking with gcc, the default backend.
+"""
+
+from typing import List
+
+
+class LinkError(Exception):
+    """gcc failed, the message is its output"""
+
+
+def link_with_gcc(instructions: List[str], bin_out: str):
+    """Writes the assembly next to bin_out, as bin_out.S, and links it"""
+    # Only needed by this backend, subprocess is slow to import
+    import subprocess
+
+    asm_out = bin_out + ".S"
+    with open(asm_out, "w") as output:
+        output.write("\n".join(instructions))
+    try:
+        subprocess.run(["gcc", asm_out, "-o", bin_out], check=True, capture_output=True)
+    except subprocess.CalledProcessError as e:
+        raise LinkError(e.stderr.decode(errors="replace").strip()) from None
@@ -0,0 +1,122 @@
+"""
+Instruction sequences for multiplying and dividing by constants.
+Operands are AT&T locations: registers ("%rcx") or stack slots ("8(%rsp)").
+"""
+
+from typing import List, Optional, Tuple
+
+INT32_MIN = -(1 << 31)
+INT32_MAX = (1 << 31) - 1
+WORD_BITS = 64
+WORD_MASK = (1 << WORD_BITS) - 1
+
+# Multipliers computed by a single lea, by their scale
+LEA_MULTIPLIERS = {3: 2, 5: 4, 9: 8}
+
+
+def is_memory(location: str) -> bool:
+    return not location.startswith(("%", "$"))
+
+
+def fits_int32(value: int) -> bool:
+    return INT32_MIN <= value <= INT32_MAX
+
+
+def is_power_of_two(value: int) -> bool:
+    return value > 0 and value & (value - 1) == 0
+
+
+def sized(mnemonic: str, operand: str) -> str:
+    """Adds the operand size suffix, needed when the only operand is in memory"""
+    return f"{mnemonic}q" if is_memory(operand) else mnemonic
+
+
+def multiply_by_constant(dest: str, source: str, constant: int) -> Optional[List[str]]:
+    """
+    Computes dest = source * constant, dest being a register.
+    Returns None if there's nothing better than a register to register imul.
+    """
+    move = [] if dest == source else [f"mov {source}, {dest}"]
+    if constant == 1:
+        return move
+    if is_power_of_two(constant):
+        return move + [f"shl ${constant.bit_length() - 1}, {dest}"]
+    if constant in LEA_MULTIPLIERS and not is_memory(source):
+        scale = LEA_MULTIPLIERS[constant]
+        return [f"lea ({source},{source},{scale}), {dest}"]
+    if fits_int32(constant):
+        return [f"imul ${constant}, {source}, {dest}"]
+    return None
+
+
+def signed_division_magic(divisor: int) -> Tuple[int, int]:
+    """
+    Magic multiplier and shift for dividing 64 bit signed integers by
+    divisor, from Hacker's Delight (10-1). abs(divisor) must be at least 2.
+    """
+    two_63 = 1 << (WORD_BITS - 1)
+    absolute = abs(divisor)
+    t = two_63 + (1 if divisor < 0 else 0)
+    absolute_nc = t - 1 - t % absolute
+    p = WORD_BITS - 1
+    q1, r1 = divmod(two_63, absolute_nc)
+    q2, r2 = divmod(two_63, absolute)
+    while True:
+        p += 1
+        q1, r1 = 2 * q1, 2 * r1
+        if r1 >= absolute_nc:
+            q1, r1 = q1 + 1, r1 - absolute_nc
+        q2, r2 = 2 * q2, 2 * r2
+        if r2 >= absolute:
+            q2, r2 = q2 + 1, r2 - absolute
+        delta = absolute - r2
+        if not (q1 < delta or (q1 == delta and r1 == 0)):
+            break
+    magic = (q2 + 1) & WORD_MASK
+    if divisor < 0:
+        magic = -magic & WORD_MASK
+    if magic >> (WORD_BITS - 1):
+        magic -= 1 << WORD_BITS
+    return magic, p - WORD_BITS
+
+
+def divide_by_constant(source: str, divisor: int) -> List[str]:
+    """
+    Computes source / divisor into rax, rounding towards zero like idiv.
+    source must not be rax or rdx, rdx is clobbered.
+    abs(divisor) must be at least 2.
+    """
+    absolute = abs(divisor)
+    if is_power_of_two(absolute):
+        # Negative dividends are biased by divisor - 1, to round towards zero
+        shift = absolute.bit_length() - 1
+        lines = [
+            f"mov {source}, %rax",
+            "cqo",
+            f"shr ${WORD_BITS - shift}, %rdx",
+            "add %rdx, %rax",
+            f"sar ${shift}, %rax",
+        ]
+        if divisor < 0:
+            lines.append("neg %rax")
+        return lines
+    magic, shift = signed_division_magic(divisor)
+    lines = [
+        f"mov ${magic}, %rax",
+        f"{sized('imul', source)} {source}",
+    ]
+    if divisor > 0 and magic < 0:
+        lines.append(f"add {source}, %rdx")
+    elif divisor < 0 and magic > 0:
+        lines.append(f"sub {source}, %rdx")
+    if shift:
+        lines.append(f"sar ${shift}, %rdx")
+    # Add one to negative quotients
+    lines.extend(
+        [
+            "mov %rdx, %rax",
+            "shr $63, %rax",
+            "add %rdx, %rax",
+        ]
+    )
+    return lines
@@ -0,0 +1,111 @@
+"""
+Wall time, peak memory and item counts of every pass of a compilation, shown
+by compile --time-passes and written by compile --stats-json.
+"""
+
+from time import perf_counter
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, List
+
+from ast_lowering import expression_children
+
+
+@dataclass
+class PassRecord:
+    name: str
+    seconds: float
+    # Peak memory allocated while the pass ran, above what it started with
+    peak_bytes: int
+    items: Dict[str, int] = field(default_factory=dict)
+
+
+class Instrumentation:
+    # Tracing memory slows the passes down several times, and some more than
+    # others. Times are best measured without it, and peaks by another
+    # compilation with it, see add_peak_bytes.
+    def __init__(self, enabled: bool = True, trace_memory: bool = True):
+        self.enabled = enabled
+        self.trace_memory = trace_memory
+        self.passes: List[PassRecord] = []
+        # Filled by the optimizers, see optimization.optimize
+        self.statistics: Dict[str, int] = {}
+
+    def run(
+        self, name: str, function: Callable[[], Any], **counters: Callable[[Any], int]
+    ):
+        """Runs function as the pass name, counting items of its result with counters"""
+        if not self.enabled:
+            return function()
+        if self.trace_memory:
+            # Only imported when tracing, starting it up costs a few milliseconds
+            import tracemalloc
+
+            # Allocations made before starting aren't traced, so that frees of
+            # objects made by earlier passes don't offset the peak
+            already_tracing = tracemalloc.is_tracing()
+            if already_tracing:
+                tracemalloc.reset_peak()
+                baseline = tracemalloc.get_traced_memory()[0]
+            else:
+                tracemalloc.start()
+                baseline = 0
+        start = perf_counter()
+        try:
+            result = function()
+            seconds = perf_counter() - start
+        finally:
+            if self.trace_memory:
+                peak_bytes = tracemalloc.get_traced_memory()[1] - baseline
+                if not already_tracing:
+                    tracemalloc.stop()
+        if not self.trace_memory:
+            peak_bytes = 0
+        items = {item: count(result) for item, count in counters.items()}
+        self.passes.append(PassRecord(name, seconds, peak_bytes, items))
+        return result
+
+    def add_peak_bytes(self, traced: "Instrumentation"):
+        """Takes the peak memory of the passes from a traced run of the same compilation"""
+        for record, traced_record in zip(self.passes, traced.passes):
+            if record.name == traced_record.name:
+                record.peak_bytes = traced_record.peak_bytes
+
+    def total_seconds(self) -> float:
+        return sum(record.seconds for record in self.passes)
+
+    def peak_bytes(self) -> int:
+        return max((record.peak_bytes for record in self.passes), default=0)
+
+    def table(self) -> str:
+        lines = [f"{'pass':<14} {'time ms':>9} {'peak KiB':>9}  items"]
+        for record in self.passes:
+            items = " ".join(f"{item}={count}" for item, count in record.items.items())
+            lines.append(
+                f"{record.name:<14} {record.seconds * 1000:>9.3f} "
+                f"{record.peak_bytes / 1024:>9.1f}  {items}".rstrip()
+            )
+        lines.append(
+            f"{'total':<14} {self.total_seconds() * 1000:>9.3f} {self.peak_bytes() / 1024:>9.1f}"
+        )
+        for statistic, count in self.statistics.items():
+            lines.append(f"{statistic:<24} {count:>9}")
+        return "\n".join(lines)
+
+    def to_json(self) -> dict:
+        return {
+            "passes": [asdict(record) for record in self.passes],
+            "total_seconds": self.total_seconds(),
+            "peak_bytes": self.peak_bytes(),
+            "statistics": dict(self.statistics),
+        }
+
+
+def count_nodes(ast: list) -> int:
+    """Number of statements and expressions of the program"""
+    count = 0
+    pending = list(ast)
+    while pending:
+        node = pending.pop()
+        count += 1
+        pending.extend(expression_children(node))
+    return count
@@ -1,4 +1,11 @@
-from dataclasses import dataclass
+"""
+Straight-line SSA IR.
+Every instruction with a dest defines a new value, named "%<id>", which is
+never redefined. Operands always refer to values defined earlier.
+"""
+
+from dataclasses import dataclass, replace
+from typing import Callable, Dict, List, Tuple
 
 
 @dataclass
@@ -6,17 +13,40 @@ class LoadConstant:
     dest: str
     value: int
 
+    @property
+    def operands(self) -> Tuple[str, ...]:
+        return ()
+
+    def map_operands(self, function: Callable[[str], str]):
+        return self
+
 
 @dataclass
 class LoadVariable:
+    """Copies a value, e.g. when assigning a variable"""
+
     dest: str
     source: str
 
+    @property
+    def operands(self) -> Tuple[str, ...]:
+        return (self.source,)
+
+    def map_operands(self, function: Callable[[str], str]):
+        return replace(self, source=function(self.source))
+
 
 @dataclass
-class UnaryOperation:
-    op: str
-    var: str
+class Negate:
+    dest: str
+    source: str
+
+    @property
+    def operands(self) -> Tuple[str, ...]:
+        return (self.source,)
+
+    def map_operands(self, function: Callable[[str], str]):
+        return replace(self, source=function(self.source))
 
 
 @dataclass
@@ -26,7 +56,70 @@ class BinaryOperation:
     lhs: str
     rhs: str
 
+    @property
+    def operands(self) -> Tuple[str, ...]:
+        return (self.lhs, self.rhs)
+
+    def map_operands(self, function: Callable[[str], str]):
+        return replace(self, lhs=function(self.lhs), rhs=function(self.rhs))
+
 
 @dataclass
 class Return:
     var: str
+
+    dest = None
+
+    @property
+    def operands(self) -> Tuple[str, ...]:
+        return (self.var,)
+
+    def map_operands(self, function: Callable[[str], str]):
+        return replace(self, var=function(self.var))
+
+
+class VerificationError(Exception):
+    pass
+
+
+class DefUse:
+    """Definition and use sites (instruction indices) of every value"""
+
+    def __init__(self, ir: list):
+        self.ir = ir
+        self.definitions: Dict[str, int] = {}
+        self.uses: Dict[str, List[int]] = {}
+        for index, instruction in enumerate(ir):
+            for operand in instruction.operands:
+                self.uses.setdefault(operand, []).append(index)
+            if instruction.dest is not None:
+                self.definitions[instruction.dest] = index
+
+    def definition(self, value: str):
+        return self.ir[self.definitions[value]]
+
+    def uses_of(self, value: str) -> List[int]:
+        return self.uses.get(value, [])
+
+    def last_use(self, value: str) -> int:
+        """Index of the last use, or of the definition if the value is never used"""
+        uses = self.uses_of(value)
+        return uses[-1] if uses else self.definitions[value]
+
+
+def verify(ir: list):
+    """Checks that the IR is in SSA form, raising VerificationError if not"""
+    defined = set()
+    for index, instruction in enumerate(ir):
+        for operand in instruction.operands:
+            if operand not in defined:
+                raise VerificationError(
+                    f"{operand} used before its definition in #{index}: {instruction}"
+                )
+        if instruction.dest is None:
+            continue
+        if instruction.dest in defined:
+            raise VerificationError(
+                f"{instruction.dest} redefined in #{index}: {instruction}"
+            )
+        defined.add(instruction.dest)
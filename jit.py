@@ -0,0 +1,129 @@
+"""
+Runs programs in process: the code is assembled into an executable mapping
+and called through ctypes, instead of being linked and run as a child.
+"""
+
+import ctypes
+import mmap
+from typing import List, Union
+
+from assembler import Assembler
+from code_gen import CodeGen
+from compiler import compile_source
+from instruction_selection import sized
+from source import Source
+
+PAGE_SIZE = mmap.PAGESIZE
+DIVISION_ERROR = "division_error"
+
+libc = ctypes.CDLL(None, use_errno=True)
+libc.mprotect.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.c_int]
+
+
+class Result(ctypes.Structure):
+    """Returned in rax and rdx, status is 1 after a division by zero"""
+
+    _fields_ = [("value", ctypes.c_int64), ("status", ctypes.c_int64)]
+
+
+class JitCodeGen(CodeGen):
+    """
+    Compiles main to a function returning the value instead of printing it.
+    Divisions by zero return to the caller instead of raising SIGFPE in it,
+    and dividing INT64_MIN by -1 wraps around.
+    """
+
+    RETURN = ["ret"]
+    EPILOGUE = []
+
+    def __init__(self):
+        super().__init__()
+        self.guarded_divisions = 0
+
+    def code_gen(self, ir):
+        lines = super().code_gen(ir)
+        if self.guarded_divisions:
+            lines.append(f"{DIVISION_ERROR}:")
+            lines.append("mov $1, %edx")
+            lines.extend(self.frame_exit())
+            lines.append("ret")
+        return lines
+
+    def return_value(self, location: str):
+        self.move(location, "%rax")
+        self.output.append("xor %edx, %edx")
+
+    def compile_div(self, operation):
+        divisor = self.constants.get(operation.rhs)
+        if divisor is not None and divisor not in (0, -1):
+            super().compile_div(operation)
+            return
+        dest, lhs, rhs = self.locations(operation)
+        label = f"division_{self.guarded_divisions}"
+        self.guarded_divisions += 1
+        self.output.extend(
+            [
+                f"{sized('cmp', rhs)} $0, {rhs}",
+                f"je {DIVISION_ERROR}",
+                f"{sized('cmp', rhs)} $-1, {rhs}",
+                f"jne {label}",
+            ]
+        )
+        self.move(lhs, "%rax")
+        self.output.extend(
+            [
+                "neg %rax",
+                f"jmp {label}_done",
+                f"{label}:",
+            ]
+        )
+        self.move(lhs, "%rax")
+        self.output.extend(
+            [
+                "cqo",
+                f"{sized('idiv', rhs)} {rhs}",
+                f"{label}_done:",
+            ]
+        )
+        self.move("%rax", dest)
+
+
+class JitFunction:
+    """Machine code mapped read and execute only, callable from Python"""
+
+    def __init__(self, code: bytes, entry: int = 0):
+        size = max(PAGE_SIZE, -(-len(code) // PAGE_SIZE) * PAGE_SIZE)
+        self.memory = mmap.mmap(-1, size, prot=mmap.PROT_READ | mmap.PROT_WRITE)
+        self.memory.write(code)
+        buffer = ctypes.c_char.from_buffer(self.memory)
+        self.address = ctypes.addressof(buffer)
+        del buffer
+        if libc.mprotect(self.address, size, mmap.PROT_READ | mmap.PROT_EXEC) != 0:
+            raise OSError(ctypes.get_errno(), "mprotect failed")
+        self.function = ctypes.CFUNCTYPE(Result)(self.address + entry)
+
+    def __call__(self) -> int:
+        result = self.function()
+        if result.status:
+            raise ZeroDivisionError("division by zero")
+        return result.value
+
+    def close(self):
+        self.function = None
+        self.memory.close()
+
+
+def jit_compile(lines: List[str]) -> JitFunction:
+    """Assembles lines emitted by JitCodeGen, every reference is rip relative"""
+    assembler = Assembler().assemble(lines)
+    _, entry = assembler.labels["main"]
+    return JitFunction(assembler.link(0), entry)
+
+
+def run(content: Union[str, Source], opt_level: int = 0) -> int:
+    """Compiles and runs a program, returning its 64 bit result"""
+    function = jit_compile(compile_source(content, opt_level, code_gen=JitCodeGen()))
+    try:
+        return function()
+    finally:
+        function.close()
@@ -1,9 +1,11 @@
-from typing import List
+import re
+from typing import Iterator, List, Union
 
 from position import Position, Line
+from source import Source
 from errors import CompilationError
 from tokens import Token, Identifier, Keyword, Seperator, Literal, Operator, Whitespace
-from token_stream import TokenStream
+from token_stream import TokenStream, StreamingTokenStream
 
 
 class UnknownCharacher(CompilationError):
@@ -12,32 +14,75 @@ class UnknownCharacher(CompilationError):
         super().__init__(position, f'Unkown character "{unknown}"')
 
 
+class EmptyProgramError(CompilationError):
+    def __init__(self, source: Source):
+        end = len(source)
+        super().__init__(source.position(end, end), "Expected a program")
+
+
 class Tokenizer:
-    def tokenize(self, content: str) -> List[Token]:
-        tokens = []
-        lines = content.split("\n")
-        for line_number, line in enumerate(lines, start=1):
-            tokens.extend(self.tokenize_line(Line(line, line_number)))
+    # Order matters: the first class whose pattern matches at an offset wins,
+    # which is how keywords take priority over identifiers.
+    TOKEN_CLASSES = [Whitespace, Operator, Seperator, Keyword, Literal, Identifier]
+    MASTER_PATTERN = re.compile(
+        "|".join(f"(?P<{cls.__name__}>{cls.PATTERN.pattern})" for cls in TOKEN_CLASSES)
+    )
+    # Used for sources backed by bytes, such as memory mapped files. Those are
+    # ASCII, see Source.from_path, where \w and \d match like in str.
+    MASTER_BYTES_PATTERN = re.compile(MASTER_PATTERN.pattern.encode())
+    CLASS_BY_GROUP = {cls.__name__: cls for cls in TOKEN_CLASSES}
+
+    def tokenize(self, content: Union[str, Source]) -> TokenStream:
+        source = content if isinstance(content, Source) else Source(content)
+        tokens = list(self.scan(source))
+        if not tokens:
+            raise EmptyProgramError(source)
         return TokenStream(tokens)
 
+    def stream(self, content: Union[str, Source]) -> StreamingTokenStream:
+        """Like tokenize, but produces tokens lazily as the parser consumes them"""
+        source = content if isinstance(content, Source) else Source(content)
+        try:
+            return StreamingTokenStream(self.scan(source))
+        except ValueError:
+            raise EmptyProgramError(source) from None
+
     @staticmethod
     def tokenize_line(line: Line) -> List[Token]:
-        tokens = []
+        return list(Tokenizer.scan(Source(line.content, line.number)))
+
+    @staticmethod
+    def scan(content: Union[str, Source]) -> Iterator[Token]:
+        """Scan the whole buffer with a single alternation of all token patterns"""
+        source = content if isinstance(content, Source) else Source(content)
+        is_binary = source.is_binary
+        if is_binary:
+            pattern = Tokenizer.MASTER_BYTES_PATTERN
+        else:
+            pattern = Tokenizer.MASTER_PATTERN
         offset = 0
-        while offset < len(line.content):
-            token = Tokenizer.token_at(line, offset)
-            offset = token.pos.end
-            if type(token) is Whitespace:
+        for match in pattern.finditer(source.buffer):
+            start, end = match.span()
+            if start != offset:
+                raise UnknownCharacher(source.position(offset, offset + 1))
+            offset = end
+            kind = match.lastgroup
+            if kind == "Whitespace":
                 continue
-            tokens.append(token)
-        return tokens
+            value = match.group()
+            if is_binary:
+                value = value.decode()
+            yield Tokenizer.CLASS_BY_GROUP[kind](value, start, end, source)
+        if offset != len(source):
+            raise UnknownCharacher(source.position(offset, offset + 1))
 
     @staticmethod
     def token_at(line: Line, offset: int) -> Token:
-        for cls in [Whitespace, Operator, Seperator, Keyword, Literal, Identifier]:
+        """Reference matcher, trying each token class separately"""
+        source = Source(line.content, line.number)
+        for cls in Tokenizer.TOKEN_CLASSES:
             match = cls.PATTERN.match(line.content, offset)
             if match is None:
                 continue
-            position = Position(line, *match.span())
-            return cls(match.group(), pos=position)
-        raise UnknownCharacher(Position(line, offset, offset + 1))
+            return cls(match.group(), *match.span(), source)
+        raise UnknownCharacher(source.position(offset, offset + 1))
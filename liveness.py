@@ -0,0 +1,23 @@
+from dataclasses import dataclass
+from typing import List
+
+from ir import DefUse
+
+
+@dataclass
+class LiveInterval:
+    value: str
+    # Index of the defining instruction
+    start: int
+    # Index of the last use, the definition itself for unused values
+    end: int
+
+
+def live_intervals(ir: list) -> List[LiveInterval]:
+    """Live intervals of every value defined in straight-line SSA IR, by start"""
+    def_use = DefUse(ir)
+    return [
+        LiveInterval(instruction.dest, index, def_use.last_use(instruction.dest))
+        for index, instruction in enumerate(ir)
+        if instruction.dest is not None
+    ]
@@ -1,34 +1,92 @@
-import click
+"""
+Entry point of the compiler. The common compile and run invocations are
+parsed here, without importing click. Anything else, including --help and
+malformed arguments, goes to the click CLI in cli.py.
+"""
+
 import sys
-import subprocess
-
-from lexing import Tokenizer
-from parsing import Parser
-from semantic_analysis import SemanticAnalyzer
-from ast_lowering import LoweringPass
-from code_gen import CodeGen
-from errors import CompilationError
-
-
-@click.command()
-@click.argument("path")
-@click.option("-o", "--output", "bin_out", default="a.out")
-def main(path: str, bin_out: str):
-    asm_out = bin_out + ".S"
-    with open(path) as file:
-        content = file.read()
-    try:
-        tokens = Tokenizer().tokenize(content)
-        ast = Parser().parse(tokens)
-        SemanticAnalyzer().analyze(ast)
-        ir = LoweringPass().lower(ast)
-        instructions = CodeGen().code_gen(ir)
-    except CompilationError as e:
-        print(f'Error compiling "{path}":\n{e}', file=sys.stderr)
-        return
-    with open(asm_out, "w") as output:
-        output.write("\n".join(instructions))
-    subprocess.run(["gcc", asm_out, "-o", bin_out])
+from typing import List, Optional, Tuple
+
+# Options taking a value by command, and the argument they set
+FAST_PATH_OPTIONS = {
+    "compile": {
+        "-o": "bin_out",
+        "--output": "bin_out",
+        "-O": "opt_level",
+        "--backend": "backend",
+        "--stats-json": "stats_json",
+    },
+    "run": {"-O": "opt_level"},
+}
+FAST_PATH_FLAGS = {
+    "compile": {"--time-passes": "time_passes"},
+    "run": {"--jit": "use_jit"},
+}
+COMMANDS = ["compile", "serve", "build", "run"]
+FAST_PATH_DEFAULTS = {
+    "compile": {"bin_out": "a.out", "opt_level": "0", "backend": "gcc"},
+    "run": {"opt_level": "0", "use_jit": False},
+}
+
+
+def parse_fast_path(argv: List[str]) -> Optional[Tuple[str, dict]]:
+    """The command and its arguments, None if click is needed to parse argv"""
+    if not argv or argv[0] not in FAST_PATH_OPTIONS:
+        return None
+    command = argv[0]
+    options, flags = FAST_PATH_OPTIONS[command], FAST_PATH_FLAGS[command]
+    arguments = dict(FAST_PATH_DEFAULTS[command])
+    paths = []
+    rest = iter(argv[1:])
+    for argument in rest:
+        if argument.startswith("-O") and len(argument) > 2:
+            name, value = "-O", argument[2:]
+        else:
+            name, equals, value = argument.partition("=")
+            if not equals:
+                value = None
+        if name in flags and value is None:
+            arguments[flags[name]] = True
+        elif name in options:
+            value = next(rest, None) if value is None else value
+            if value is None:
+                return None
+            arguments[options[name]] = value
+        elif argument.startswith("-"):
+            return None
+        else:
+            paths.append(argument)
+    if len(paths) != 1 or not arguments["opt_level"].isdigit():
+        return None
+    if arguments.get("backend", "gcc") not in ("gcc", "native"):
+        return None
+    arguments["path"] = paths[0]
+    arguments["opt_level"] = int(arguments["opt_level"])
+    return command, arguments
+
+
+def with_command(argv: List[str]) -> List[str]:
+    """Adds compile to argv without a command, like main.py prog.kal -o prog"""
+    if argv and argv[0] not in COMMANDS and argv[0] != "--help":
+        return ["compile", *argv]
+    return argv
+
+
+def main(argv: Optional[List[str]] = None):
+    argv = with_command(sys.argv[1:] if argv is None else argv)
+    parsed = parse_fast_path(argv)
+    if parsed is not None:
+        from optimization import MAX_OPT_LEVEL
+
+        command, arguments = parsed
+        if arguments["opt_level"] <= MAX_OPT_LEVEL:
+            import commands
+
+            getattr(commands, f"{command}_command")(**arguments)
+            return
+    from cli import main as cli_main
+
+    cli_main(args=argv, prog_name="main.py")
 
 
 if __name__ == "__main__":
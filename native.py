@@ -0,0 +1,95 @@
+"""
+Static x86-64 Linux executables, assembled and linked without gcc.
+
+The program is linked with a small runtime: _start calls main and exits with
+its return value, and printf is replaced by a routine printing its second
+argument like printf("%d\\n", value) does.
+"""
+
+import struct
+from typing import List
+
+from assembler import Assembler
+
+BASE_ADDRESS = 0x400000
+ELF_HEADER = struct.Struct("<16sHHIQQQIHHHHHH")
+PROGRAM_HEADER = struct.Struct("<IIQQQQQQ")
+HEADERS_SIZE = ELF_HEADER.size + PROGRAM_HEADER.size
+ELF_IDENT = b"\x7fELF\x02\x01\x01" + bytes(9)
+ET_EXEC = 2
+EM_X86_64 = 62
+PT_LOAD = 1
+PF_X = 1
+PF_R = 4
+PAGE_SIZE = 0x1000
+SYS_WRITE = 1
+SYS_EXIT = 60
+STDOUT = 1
+
+RUNTIME = [
+    "_start:",
+    "call main",
+    "mov %rax, %rdi",
+    f"mov ${SYS_EXIT}, %eax",
+    "syscall",
+    # Formats the low 32 bits of rsi in the red zone, from the last digit
+    "printf:",
+    "movslq %esi, %rax",
+    "mov %rax, %r8",
+    "mov %rsp, %rsi",
+    "dec %rsi",
+    "movb $10, (%rsi)",
+    "mov $10, %ecx",
+    "test %rax, %rax",
+    "jns printf_digits",
+    "neg %rax",
+    "printf_digits:",
+    "xor %edx, %edx",
+    "div %rcx",
+    "add $48, %edx",
+    "dec %rsi",
+    "movb %dl, (%rsi)",
+    "test %rax, %rax",
+    "jnz printf_digits",
+    "test %r8, %r8",
+    "jns printf_write",
+    "dec %rsi",
+    "movb $45, (%rsi)",
+    "printf_write:",
+    "mov %rsp, %rdx",
+    "sub %rsi, %rdx",
+    f"mov ${STDOUT}, %edi",
+    f"mov ${SYS_WRITE}, %eax",
+    "syscall",
+    "xor %eax, %eax",
+    "ret",
+]
+
+
+def link_executable(instructions: List[str]) -> bytes:
+    """An ELF executable running the assembly lines CodeGen emitted"""
+    assembler = Assembler().assemble(RUNTIME + instructions)
+    image = assembler.link(BASE_ADDRESS + HEADERS_SIZE)
+    entry = BASE_ADDRESS + HEADERS_SIZE + assembler.labels["_start"][1]
+    size = HEADERS_SIZE + len(image)
+    header = ELF_HEADER.pack(
+        ELF_IDENT,
+        ET_EXEC,
+        EM_X86_64,
+        1,
+        entry,
+        ELF_HEADER.size,
+        0,
+        0,
+        ELF_HEADER.size,
+        PROGRAM_HEADER.size,
+        1,
+        0,
+        0,
+        0,
+    )
+    # A single segment maps the whole file, headers included
+    segment = PROGRAM_HEADER.pack(
+        PT_LOAD, PF_R | PF_X, 0, BASE_ADDRESS, BASE_ADDRESS, size, size, PAGE_SIZE
+    )
+    return header + segment + image
@@ -0,0 +1,45 @@
+from typing import Dict, Optional
+
+MAX_OPT_LEVEL = 1
+PEEPHOLE_OPT_LEVEL = 1
+
+
+def optimize(
+    ir: list, opt_level: int, statistics: Optional[Dict[str, int]] = None
+) -> list:
+    """Runs the passes of opt_level, collecting their statistics if asked to"""
+    if statistics is None:
+        statistics = {}
+    if opt_level >= 1:
+        # The passes are imported when needed, which keeps -O0 startup short
+        from constant_folding import ConstantFoldingPass
+        from copy_propagation import CopyPropagation
+        from value_numbering import LocalValueNumbering
+        from dead_code_elimination import DeadCodeElimination
+
+        ir = ConstantFoldingPass().fold(ir)
+        copy_propagation = CopyPropagation()
+        ir = copy_propagation.propagate(ir)
+        statistics["copyprop.eliminated"] = copy_propagation.eliminated
+        value_numbering = LocalValueNumbering()
+        ir = value_numbering.number(ir)
+        statistics["cse.eliminated"] = value_numbering.eliminated
+        dce = DeadCodeElimination()
+        ir = dce.eliminate(ir)
+        statistics.update(dce.statistics())
+    return ir
+
+
+def optimize_assembly(
+    lines: list, opt_level: int, statistics: Optional[Dict[str, int]] = None
+) -> list:
+    """Runs the peephole optimizer over the assembly if opt_level enables it"""
+    if statistics is None:
+        statistics = {}
+    if opt_level >= PEEPHOLE_OPT_LEVEL:
+        from peephole import PeepholeOptimizer
+
+        peephole = PeepholeOptimizer()
+        lines = peephole.optimize(lines)
+        statistics.update(peephole.statistics())
+    return lines
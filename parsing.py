@@ -1,9 +1,9 @@
-from functools import singledispatchmethod
-
 from tokens import TokenKind, Identifier, Literal, Operator, Seperator, Keyword
 from token_stream import TokenStream
 from errors import CompilationError
 from ast_ import BinaryOperation, UnaryOperation, Assignment, Return, Decleration
+from dispatch import dispatchmethod
+from trampoline import trampoline
 
 
 class UnexpectedTokenError(CompilationError):
@@ -29,7 +29,7 @@ class Parser:
             parsed.append(ast_element)
         return parsed
 
-    @singledispatchmethod
+    @dispatchmethod
     def parse_token(self, token, tokens: TokenStream):
         raise UnexpectedTokenError(token)
 
@@ -47,33 +47,57 @@ class Parser:
     def parse_expression_until_seperator(
         self, tokens: TokenStream, seperator: Seperator
     ):
-        root = self.parse_operand(tokens)
+        return trampoline(self._parse_expression_until_seperator(tokens, seperator))
 
+    def _parse_expression_until_seperator(
+        self, tokens: TokenStream, seperator: Seperator
+    ):
+        operands = [(yield self._parse_operand(tokens.pop(), tokens))]
+        operators = []
         while True:
             token = tokens.pop()
             if token == seperator:
                 break
-            elif type(token) is Operator:
-                operator = token
-                rhs = self.parse_operand(tokens)
-                root = BinaryOperation(root, operator, rhs)
-                root = Parser.encforce_order_of_operation(root)
+            elif Parser.is_binary_operator(token):
+                order = BinaryOperation.ORDER_OF_OPERATIONS[token.value]
+                Parser.reduce_operations(operands, operators, order)
+                operators.append(token)
+                operands.append((yield self._parse_operand(tokens.pop(), tokens)))
             else:
                 raise ExpectedTokenError(token, seperator.value)
-        return root
+        Parser.reduce_operations(operands, operators, 0)
+        return operands[0]
+
+    @staticmethod
+    def is_binary_operator(token: TokenKind):
+        return (
+            type(token) is Operator
+            and token.value in BinaryOperation.ORDER_OF_OPERATIONS
+        )
+
+    @staticmethod
+    def reduce_operations(operands: list, operators: list, min_order: int):
+        """Builds the pending operations binding at least as tight as min_order"""
+        while (
+            operators
+            and BinaryOperation.ORDER_OF_OPERATIONS[operators[-1].value] >= min_order
+        ):
+            rhs = operands.pop()
+            lhs = operands.pop()
+            operands.append(BinaryOperation(lhs, operators.pop(), rhs))
 
     def parse_operand(self, tokens: TokenStream):
         token = tokens.pop()
-        return self._parse_operand(token, tokens)
+        return trampoline(self._parse_operand(token, tokens))
 
-    @singledispatchmethod
+    @dispatchmethod
     def _parse_operand(self, token, tokens: TokenStream):
         raise UnexpectedTokenError(token)
 
     @_parse_operand.register
     def _(self, operator: Operator, tokens: TokenStream):
         if operator.value == "-":
-            operand = self.parse_operand(tokens)
+            operand = yield self._parse_operand(tokens.pop(), tokens)
             return UnaryOperation(operator, operand)
         else:
             raise UnexpectedTokenError(operator)
@@ -87,7 +111,9 @@ class Parser:
     def _(self, seperator: Seperator, tokens: TokenStream):
         if seperator.value != "(":
             raise UnexpectedTokenError(seperator)
-        expression = self.parse_expression_until_seperator(tokens, Seperator(")"))
+        expression = yield self._parse_expression_until_seperator(
+            tokens, Seperator(")")
+        )
         if type(expression) is BinaryOperation:
             return expression.parenthesize()
         return expression
@@ -116,17 +142,3 @@ class Parser:
             raise ExpectedTokenError(maybe_equal_sign, "=")
         expression = self.parse_expression(tokens)
         return Decleration(maybe_identifier, expression)
-
-    @staticmethod
-    def encforce_order_of_operation(root: BinaryOperation):
-        if type(root.lhs) is BinaryOperation and root.is_lower_order(root.lhs):
-            new_root = root.lhs
-            root.lhs = new_root.rhs
-            new_root.rhs = root
-            return new_root
-        if type(root.rhs) is BinaryOperation and root.is_lower_order(root.rhs):
-            new_root = root.rhs
-            root.rhs = new_root.lhs
-            new_root.lhs = root
-            return new_root
-        return root
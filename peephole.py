@@ -0,0 +1,145 @@
+"""
+Peephole optimization of the assembly lines produced by CodeGen.
+
+Rules look at a fixed size window of consecutive lines and return the lines
+replacing it, or None if they don't apply. The code CodeGen emits never keeps
+flags alive between instructions, so rules are free to change them.
+"""
+
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple
+
+from instruction_selection import is_memory
+
+# Splits operands on commas outside of parentheses, "(%rsi,%rsi,2)" is one
+OPERAND_SEPERATOR = re.compile(r",\s*(?![^()]*\))")
+MOVES = ("mov", "movq")
+# 32 bit halves of the registers, writing them zeroes the upper half
+DWORD_REGISTERS = {
+    "%rax": "%eax",
+    "%rbx": "%ebx",
+    "%rcx": "%ecx",
+    "%rdx": "%edx",
+    "%rsi": "%esi",
+    "%rdi": "%edi",
+    **{f"%r{n}": f"%r{n}d" for n in range(8, 16)},
+}
+
+
+def parse(line: str) -> Tuple[str, List[str]]:
+    """Splits an instruction into its mnemonic and operands"""
+    mnemonic, _, operands = line.strip().partition(" ")
+    operands = operands.strip()
+    return mnemonic, OPERAND_SEPERATOR.split(operands) if operands else []
+
+
+def is_instruction(line: str) -> bool:
+    return not line.startswith(".") and not line.endswith(":")
+
+
+def references(operand: str, location: str) -> bool:
+    """Whether operand reads location, as a whole or inside an address"""
+    return location in operand
+
+
+def as_move(line: str) -> Optional[Tuple[str, str]]:
+    mnemonic, operands = parse(line)
+    if mnemonic in MOVES and len(operands) == 2:
+        return operands[0], operands[1]
+    return None
+
+
+@dataclass
+class Rule:
+    name: str
+    size: int
+    rewrite: Callable[[List[str]], Optional[List[str]]]
+
+
+def self_move(window: List[str]) -> Optional[List[str]]:
+    move = as_move(window[0])
+    if move is not None and move[0] == move[1]:
+        return []
+    return None
+
+
+def store_load(window: List[str]) -> Optional[List[str]]:
+    """mov A, B; mov B, C reads A again instead of B, or not at all if C is A"""
+    first, second = as_move(window[0]), as_move(window[1])
+    if first is None or second is None or first[1] != second[0]:
+        return None
+    source, location = first
+    dest = second[1]
+    if source.startswith("$") or references(source, location):
+        return None
+    if dest == source:
+        return [window[0]]
+    if is_memory(location) and not is_memory(dest):
+        return [window[0], f"mov {source}, {dest}"]
+    return None
+
+
+def dead_store(window: List[str]) -> Optional[List[str]]:
+    """mov A, M; mov B, M drops the first store if B doesn't read M"""
+    first, second = as_move(window[0]), as_move(window[1])
+    if first is None or second is None or first[1] != second[1]:
+        return None
+    if references(second[0], first[1]):
+        return None
+    return [window[1]]
+
+
+def zero_register(window: List[str]) -> Optional[List[str]]:
+    move = as_move(window[0])
+    if move is None or move[0] != "$0" or is_memory(move[1]):
+        return None
+    dword = DWORD_REGISTERS.get(move[1], move[1])
+    return [f"xor {dword}, {dword}"]
+
+
+def add_zero(window: List[str]) -> Optional[List[str]]:
+    mnemonic, operands = parse(window[0])
+    if mnemonic in ("add", "sub", "shl", "sar", "shr") and operands[:1] == ["$0"]:
+        return []
+    return None
+
+
+RULES = [
+    Rule("self-move", 1, self_move),
+    Rule("add-zero", 1, add_zero),
+    Rule("store-load", 2, store_load),
+    Rule("dead-store", 2, dead_store),
+    Rule("zero-register", 1, zero_register),
+]
+
+
+class PeepholeOptimizer:
+    def __init__(self, rules: Optional[List[Rule]] = None):
+        self.rules = RULES if rules is None else rules
+        self.hits: Counter = Counter()
+
+    def optimize(self, lines: List[str]) -> List[str]:
+        """Applies the rules until none matches, returning the new lines"""
+        lines = list(lines)
+        backtrack = max((rule.size for rule in self.rules), default=1) - 1
+        index = 0
+        while index < len(lines):
+            for rule in self.rules:
+                window = lines[index : index + rule.size]
+                if len(window) < rule.size or not all(map(is_instruction, window)):
+                    continue
+                replacement = rule.rewrite(window)
+                if replacement is not None and replacement != window:
+                    lines[index : index + rule.size] = replacement
+                    self.hits[rule.name] += 1
+                    # The rewrite may have made a match with earlier lines
+                    index = max(index - backtrack, 0)
+                    break
+            else:
+                index += 1
+        return lines
+
+    def statistics(self):
+        return {f"peephole.{rule.name}": self.hits[rule.name] for rule in self.rules}
@@ -0,0 +1,87 @@
+"""
+Generates random valid Kalkar programs of a given size and shape, for
+benchmarking the compiler.
+"""
+
+import random
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+
+@dataclass
+class ProgramShape:
+    # let declarations and assignments, the return statement excluded
+    statements: int = 100
+    # Operators between the statement and its deepest operand
+    depth: int = 3
+    # Relative frequency of each binary operator
+    operators: Dict[str, float] = field(
+        default_factory=lambda: {"+": 4.0, "-": 3.0, "*": 2.0, "/": 1.0}
+    )
+    # Chance of stopping at an operand before reaching depth
+    leaf_probability: float = 0.3
+    # Chances of putting parentheses around a binary operation, and of
+    # negating an operand
+    parentheses: float = 0.2
+    negation: float = 0.1
+    # Chance of a statement assigning an existing variable instead of
+    # declaring a new one
+    reuse: float = 0.3
+    # Operands are drawn from the variables declared last
+    live_variables: int = 16
+    seed: int = 0
+
+
+class ProgramGenerator:
+    def __init__(self, shape: ProgramShape):
+        self.shape = shape
+        self.random = random.Random(shape.seed)
+        self.operators = list(shape.operators)
+        self.weights = list(shape.operators.values())
+        self.variables: List[str] = []
+
+    def generate(self) -> str:
+        statements = [self.statement() for _ in range(self.shape.statements)]
+        result = self.variables[-1] if self.variables else "0"
+        statements.append(f"return {result};")
+        return "\n".join(statements)
+
+    def statement(self) -> str:
+        expression = self.expression(self.shape.depth)
+        if self.variables and self.random.random() < self.shape.reuse:
+            return f"{self.random.choice(self.recent_variables())} = {expression};"
+        variable = f"v{len(self.variables)}"
+        self.variables.append(variable)
+        return f"let {variable} = {expression};"
+
+    def recent_variables(self) -> List[str]:
+        return self.variables[-self.shape.live_variables :]
+
+    def expression(self, depth: int) -> str:
+        if depth == 0 or self.random.random() < self.shape.leaf_probability:
+            return self.negated(self.operand())
+        (operator,) = self.random.choices(self.operators, self.weights)
+        lhs = self.expression(depth - 1)
+        # Dividing by a literal other than zero keeps the programs runnable
+        if operator == "/":
+            rhs = str(self.random.randint(1, 9))
+        else:
+            rhs = self.expression(depth - 1)
+        expression = f"{lhs} {operator} {rhs}"
+        if self.random.random() < self.shape.parentheses:
+            return self.negated(f"({expression})")
+        return expression
+
+    def operand(self) -> str:
+        if self.variables and self.random.random() < 0.7:
+            return self.random.choice(self.recent_variables())
+        return str(self.random.randint(0, 99))
+
+    def negated(self, operand: str) -> str:
+        if self.random.random() < self.shape.negation:
+            return f"-{operand}"
+        return operand
+
+
+def generate_program(shape: ProgramShape) -> str:
+    return ProgramGenerator(shape).generate()
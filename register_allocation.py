@@ -0,0 +1,83 @@
+from bisect import bisect_right
+from typing import Dict, List, Optional, Set
+
+from liveness import LiveInterval
+
+
+class LinearScanAllocator:
+    """
+    Linear scan register allocation over live intervals.
+    When registers run out, the interval ending last is spilled, so it lives
+    on the stack for its whole lifetime.
+    """
+
+    def __init__(self, registers: List[str], clobbers: Dict[str, List[int]] = None):
+        # In order of preference
+        self.registers = registers
+        # Sorted positions of the instructions overwriting each register
+        self.clobbers = clobbers or {}
+        self.assignment: Dict[str, str] = {}
+        self.spilled: Set[str] = set()
+
+    def allocate(
+        self, intervals: List[LiveInterval], hints: Dict[str, str] = None
+    ) -> Dict[str, str]:
+        """
+        Maps values to registers, values missing from the result are spilled.
+        hints maps a value to another value whose register it should reuse if
+        possible, so copies and two operand instructions need no moves.
+        """
+        hints = hints or {}
+        active: List[LiveInterval] = []
+        free = set(self.registers)
+        for interval in intervals:
+            # An interval ending where another starts can hand its register
+            # over, instructions read their operands before writing the dest
+            for expired in [other for other in active if other.end <= interval.start]:
+                active.remove(expired)
+                free.add(self.assignment[expired.value])
+            reg = self.free_register(interval, free, hints.get(interval.value))
+            if reg is None:
+                reg = self.spill_at(interval, active)
+                if reg is None:
+                    self.spilled.add(interval.value)
+                    continue
+            else:
+                free.remove(reg)
+            self.assignment[interval.value] = reg
+            active.append(interval)
+        return self.assignment
+
+    def free_register(
+        self, interval: LiveInterval, free: Set[str], hint: Optional[str] = None
+    ) -> Optional[str]:
+        hinted = self.assignment.get(hint)
+        if hinted in free and self.can_hold(hinted, interval):
+            return hinted
+        for reg in self.registers:
+            if reg in free and self.can_hold(reg, interval):
+                return reg
+        return None
+
+    def spill_at(self, interval: LiveInterval, active: List[LiveInterval]):
+        """Takes the register of the active interval ending last, if it ends later"""
+        candidates = [
+            other
+            for other in active
+            if self.can_hold(self.assignment[other.value], interval)
+        ]
+        if not candidates:
+            return None
+        victim = max(candidates, key=lambda other: other.end)
+        if victim.end <= interval.end:
+            return None
+        active.remove(victim)
+        self.spilled.add(victim.value)
+        return self.assignment.pop(victim.value)
+
+    def can_hold(self, reg: str, interval: LiveInterval) -> bool:
+        """Whether reg survives from the definition to the last use"""
+        positions = self.clobbers.get(reg, [])
+        # First clobber after the definition
+        index = bisect_right(positions, interval.start)
+        return index == len(positions) or positions[index] > interval.end
@@ -1,9 +1,10 @@
 from typing import Dict
-from functools import singledispatchmethod
 
 from ast_ import BinaryOperation, UnaryOperation, Assignment, Return, Decleration
 from lexing import Identifier, Literal
 from errors import CompilationError
+from dispatch import dispatchmethod
+from trampoline import trampoline
 
 
 class SemanticError(CompilationError):
@@ -37,15 +38,15 @@ class SemanticAnalyzer:
 
     def analyze(self, ast):
         for block in ast:
-            self.analyze_once(block)
+            trampoline(self.analyze_once(block))
 
-    @singledispatchmethod
+    @dispatchmethod
     def analyze_once(self, element):
         raise TypeError(f"No lowering implemented for {type(element)}")
 
     @analyze_once.register
     def analyze_decleration(self, decleration: Decleration):
-        self.analyze_once(decleration.expr)
+        yield self.analyze_once(decleration.expr)
         self.assure_undeclrated(decleration.identifier)
         self.symbol_table[decleration.identifier.value] = Variable(
             decleration.identifier
@@ -53,21 +54,21 @@ class SemanticAnalyzer:
 
     @analyze_once.register
     def analyze_return(self, _return: Return):
-        self.analyze_once(_return.expr)
+        yield self.analyze_once(_return.expr)
 
     @analyze_once.register
     def analyze_assignment(self, assignment: Assignment):
-        self.analyze_once(assignment.src)
+        yield self.analyze_once(assignment.src)
         self.assure_declrated(assignment.dst)
 
     @analyze_once.register
     def analyze_binary_operation(self, operation: BinaryOperation):
         for operand in [operation.rhs, operation.lhs]:
-            self.analyze_once(operand)
+            yield self.analyze_once(operand)
 
     @analyze_once.register
     def analyze_unary_operation(self, operation: UnaryOperation):
-        self.analyze_once(operation.operand)
+        yield self.analyze_once(operation.operand)
 
     @analyze_once.register
     def analyze_identifier(self, identifier: Identifier):
@@ -0,0 +1,197 @@
+"""
+A long running compile server, answering requests on a Unix domain socket.
+
+Requests and responses are JSON objects, one per line. A request is either
+{"source": ..., "opt_level": 0, "output": "assembly" | "binary"} or
+{"command": "stats"}. Responses have "ok", then "assembly" (a list of lines),
+"binary" (base64 of an executable from the native backend), "stats", or
+"error" with the diagnostic.
+"""
+
+import base64
+import json
+import os
+import socket
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+from assembler import AssemblerError
+from compiler import compile_source
+from errors import CompilationError
+from native import link_executable
+from optimization import MAX_OPT_LEVEL
+
+OUTPUTS = ("assembly", "binary")
+# Latencies kept for the percentiles
+LATENCY_WINDOW = 10_000
+
+
+class BadRequest(ValueError):
+    pass
+
+
+class LatencyMetrics:
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.total = 0.0
+        self.maximum = 0.0
+        self.recent = deque(maxlen=window)
+
+    def record(self, seconds: float, error: bool = False):
+        with self.lock:
+            self.requests += 1
+            self.errors += error
+            self.total += seconds
+            self.maximum = max(self.maximum, seconds)
+            self.recent.append(seconds)
+
+    def summary(self) -> Dict[str, float]:
+        """Latencies in microseconds, percentiles are over the recent requests"""
+        with self.lock:
+            recent = sorted(self.recent)
+            requests, errors = self.requests, self.errors
+            total, maximum = self.total, self.maximum
+
+        def percentile(fraction: float) -> float:
+            if not recent:
+                return 0.0
+            return recent[min(len(recent) - 1, int(fraction * len(recent)))] * 1e6
+
+        return {
+            "requests": requests,
+            "errors": errors,
+            "mean_us": total / requests * 1e6 if requests else 0.0,
+            "p50_us": percentile(0.5),
+            "p99_us": percentile(0.99),
+            "max_us": maximum * 1e6,
+        }
+
+
+def diagnostic(error: CompilationError) -> dict:
+    position = error.position
+    return {
+        "message": error.message,
+        "line": position.line.number,
+        "start": position.start,
+        "end": position.end,
+        "text": str(error),
+    }
+
+
+class CompileServer:
+    def __init__(self, socket_path: str, workers: Optional[int] = None):
+        self.socket_path = socket_path
+        self.metrics = LatencyMetrics()
+        # Compiles the requests, connections are read by threads of their own
+        # so that idle clients don't hold on to a worker
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.running = False
+        # Accepted and not closed yet, with the thread reading them
+        self.connections: Dict[socket.socket, threading.Thread] = {}
+        self.connections_lock = threading.Lock()
+        # A socket left behind by a server that didn't shut down
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.listener.bind(socket_path)
+        self.listener.listen()
+
+    def serve_forever(self):
+        self.running = True
+        while self.running:
+            try:
+                connection, _ = self.listener.accept()
+            except OSError:
+                if not self.running:
+                    break
+                raise
+            thread = threading.Thread(
+                target=self.serve_connection, args=(connection,), daemon=True
+            )
+            # Started under the lock, so that shutdown never joins it unstarted
+            with self.connections_lock:
+                self.connections[connection] = thread
+                thread.start()
+
+    def shutdown(self):
+        """
+        Stops accepting connections, and closes the open ones once their
+        current request is answered
+        """
+        self.running = False
+        try:
+            # Wakes up the accept of serve_forever
+            self.listener.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.listener.close()
+        # Idle clients would keep their connection open, and shutdown waiting
+        with self.connections_lock:
+            for connection in self.connections:
+                try:
+                    # Only reading, so responses being computed still go out
+                    connection.shutdown(socket.SHUT_RD)
+                except OSError:
+                    pass
+            threads = list(self.connections.values())
+        for thread in threads:
+            thread.join()
+        self.executor.shutdown(wait=True)
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    def serve_connection(self, connection: socket.socket):
+        try:
+            with connection, connection.makefile("rwb") as stream:
+                for line in stream:
+                    response = self.executor.submit(self.respond, line).result()
+                    stream.write(json.dumps(response).encode() + b"\n")
+                    stream.flush()
+        except OSError:
+            # The client went away
+            pass
+        finally:
+            with self.connections_lock:
+                self.connections.pop(connection, None)
+
+    def respond(self, line: bytes) -> dict:
+        start = time.perf_counter()
+        try:
+            response = self.handle(json.loads(line))
+        except CompilationError as e:
+            response = {"ok": False, "error": diagnostic(e)}
+        except AssemblerError as e:
+            # A constant too wide for the native backend
+            response = {"ok": False, "error": {"message": str(e)}}
+        except ValueError as e:
+            # BadRequest, or a line that isn't JSON
+            response = {"ok": False, "error": {"message": f"Bad request: {e}"}}
+        elapsed = time.perf_counter() - start
+        self.metrics.record(elapsed, error=not response["ok"])
+        response["elapsed_us"] = elapsed * 1e6
+        return response
+
+    def handle(self, request) -> dict:
+        if not isinstance(request, dict):
+            raise BadRequest("expected an object")
+        if request.get("command") == "stats":
+            return {"ok": True, "stats": self.metrics.summary()}
+        source = request.get("source")
+        opt_level = request.get("opt_level", 0)
+        output = request.get("output", "assembly")
+        if not isinstance(source, str):
+            raise BadRequest("source must be a string")
+        if opt_level not in range(MAX_OPT_LEVEL + 1):
+            raise BadRequest(f"opt_level must be between 0 and {MAX_OPT_LEVEL}")
+        if output not in OUTPUTS:
+            raise BadRequest(f"output must be one of {', '.join(OUTPUTS)}")
+        instructions = compile_source(source, opt_level)
+        if output == "binary":
+            binary = base64.b64encode(link_executable(instructions)).decode()
+            return {"ok": True, "binary": binary}
+        return {"ok": True, "assembly": instructions}
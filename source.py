@@ -0,0 +1,72 @@
+import re
+import mmap
+from array import array
+from bisect import bisect_right
+from typing import Union
+
+from position import Position, Line
+
+# Bytes the bytes patterns don't lex like the str ones do: non-ASCII bytes,
+# and the separators that str patterns take as whitespace
+NOT_BYTES_LEXABLE = re.compile(rb"[^\x00-\x1b\x20-\x7f]")
+
+
+class Source:
+    """
+    Program text addressed by absolute offsets.
+    Line information is only computed when a position has to be rendered.
+    """
+
+    def __init__(self, buffer: Union[str, bytes, mmap.mmap], first_line_number=1):
+        self.buffer = buffer
+        self.first_line_number = first_line_number
+        self._line_starts = None
+
+    @classmethod
+    def from_path(cls, path: str) -> "Source":
+        with open(path, "rb") as file:
+            try:
+                buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty files can't be mapped
+                return cls(b"")
+        if NOT_BYTES_LEXABLE.search(buffer) is not None:
+            # Decoded instead, so that identifiers can be Unicode and columns
+            # count characters
+            try:
+                return cls(str(buffer, "utf-8"))
+            finally:
+                buffer.close()
+        return cls(buffer)
+
+    @property
+    def is_binary(self) -> bool:
+        return not isinstance(self.buffer, str)
+
+    def __len__(self):
+        return len(self.buffer)
+
+    def text(self, start: int, end: int) -> str:
+        text = self.buffer[start:end]
+        if self.is_binary:
+            return text.decode()
+        return text
+
+    @property
+    def line_starts(self) -> array:
+        if self._line_starts is None:
+            newline = re.compile(b"\n" if self.is_binary else "\n")
+            self._line_starts = array(
+                "q", [0, *(match.end() for match in newline.finditer(self.buffer))]
+            )
+        return self._line_starts
+
+    def position(self, start: int, end: int) -> Position:
+        index = bisect_right(self.line_starts, start) - 1
+        line_start = self.line_starts[index]
+        if index + 1 < len(self.line_starts):
+            line_end = self.line_starts[index + 1] - 1
+        else:
+            line_end = len(self.buffer)
+        line = Line(self.text(line_start, line_end), self.first_line_number + index)
+        return Position(line, start - line_start, end - line_start)
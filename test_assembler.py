@@ -0,0 +1,142 @@
+import os
+import shutil
+import subprocess
+import tempfile
+
+import pytest
+
+from assembler import Assembler, AssemblerError
+from compiler import compile_source
+from native import RUNTIME
+from testutils import deep_left_expression, high_pressure_program
+
+
+def assemble(*lines: str) -> bytes:
+    return Assembler().assemble(list(lines)).link(0)
+
+
+def gnu_assemble(lines) -> bytes:
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "code.s")
+        obj = os.path.join(directory, "code.o")
+        binary = os.path.join(directory, "code.bin")
+        with open(source, "w") as output:
+            output.write("\n".join(lines) + "\n")
+        subprocess.run(["as", source, "-o", obj], check=True)
+        subprocess.run(
+            ["objcopy", "-O", "binary", "-j", ".text", obj, binary], check=True
+        )
+        with open(binary, "rb") as code:
+            return code.read()
+
+
+def without_references(lines):
+    """Lines assembled the same without linking, jumps are never relaxed"""
+    return [
+        line
+        for line in lines
+        if not line.startswith((".", "call", "j"))
+        and not line.endswith(":")
+        and "%rip" not in line
+    ]
+
+
+def test_register_moves():
+    assert assemble("mov %rcx, %rsi") == bytes.fromhex("4889ce")
+    assert assemble("mov %r15, %rax") == bytes.fromhex("4c89f8")
+
+
+def test_immediates():
+    assert assemble("mov $5, %rcx") == bytes.fromhex("48c7c105000000")
+    assert assemble("mov $0, %eax") == bytes.fromhex("b800000000")
+    assert assemble("mov $4294967296, %rcx") == bytes.fromhex("48b90000000001000000")
+    assert assemble("add $1, %rdi") == bytes.fromhex("4883c701")
+
+
+def test_stack_operands():
+    assert assemble("mov %rcx, 8(%rsp)") == bytes.fromhex("48894c2408")
+    assert assemble("movq $-1, (%rsp)") == bytes.fromhex("48c70424ffffffff")
+    assert assemble("idivq 16(%rsp)") == bytes.fromhex("48f77c2410")
+
+
+def test_labels_are_resolved():
+    code = assemble("call f", "ret", "f:", "ret")
+    assert code == bytes.fromhex("e801000000c3c3")
+
+
+def test_rip_relative_data():
+    code = assemble(
+        "lea  format(%rip), %rdi", ".section .rodata", "format:", '.asciz "%d\\n"'
+    )
+    assert code[:3] == bytes.fromhex("488d3d")
+    assert int.from_bytes(code[3:7], "little") == 1
+    assert code[8:] == b"%d\n\0"
+
+
+def test_undefined_label():
+    with pytest.raises(AssemblerError):
+        assemble("call nowhere")
+
+
+def test_ambiguous_size():
+    with pytest.raises(AssemblerError):
+        assemble("mov $1, 8(%rsp)")
+
+
+@pytest.mark.parametrize(
+    "line",
+    [
+        "mov $99999999999999999999999, %rax",
+        "mov $-9223372036854775809, %rax",
+        "mov $4294967296, %eax",
+        "movq $2147483648, 8(%rsp)",
+        "add $2147483648, %rax",
+        "imul $4294967295, %rcx, %rcx",
+        "movb $256, (%rax)",
+    ],
+)
+def test_immediate_out_of_range(line):
+    with pytest.raises(AssemblerError):
+        assemble(line)
+
+
+def test_immediate_limits():
+    assemble(
+        "mov $18446744073709551615, %rax",
+        "mov $-9223372036854775808, %rax",
+        "mov $4294967295, %eax",
+        "add $-2147483648, %rax",
+        "add $4294967295, %ecx",
+    )
+
+
+@pytest.mark.skipif(
+    shutil.which("as") is None or shutil.which("objcopy") is None,
+    reason="Needs the GNU assembler",
+)
+def test_matches_gnu_assembler():
+    lines = list(RUNTIME)
+    programs = [
+        high_pressure_program(2),
+        deep_left_expression(30),
+        "let a = 5; let b = a / 7; let c = a * 10000000000; return b / -4 + c * 9 - a / 0;",
+        "let a = -3; return a * a / 3 - 1;",
+    ]
+    for program in programs:
+        for opt_level in (0, 1):
+            lines.extend(compile_source(program, opt_level))
+    lines.extend(
+        [
+            "xchg %rax, %rcx",
+            "xchg %rcx, %r9",
+            "mov 8(%rbp), %r13",
+            "mov (%r13), %rax",
+            "lea (%r12,%r13,4), %rax",
+            "mov %rax, 1024(%rsp)",
+            "mulq 8(%rsp)",
+            "imul $3, 8(%rsp), %rcx",
+            "imul $1000, %rcx, %rcx",
+        ]
+    )
+    lines = without_references(lines)
+    assert assemble(*lines) == gnu_assemble(lines)
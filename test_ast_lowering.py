@@ -1,7 +1,18 @@
+import pytest
+
 from parsing import Parser
 from lexing import Tokenizer
-from ast_lowering import LoweringPass
-from ir import LoadConstant, LoadVariable, BinaryOperation, UnaryOperation, Return
+from ast_lowering import LoweringPass, sethi_ullman_labels
+from ir import (
+    LoadConstant,
+    LoadVariable,
+    BinaryOperation,
+    Negate,
+    Return,
+    DefUse,
+    VerificationError,
+    verify,
+)
 
 
 def ast_from_code(code: str):
@@ -16,6 +27,12 @@ def ast_from_expr(code: str):
     return [ast]
 
 
+def lower_expr(code: str, **variables):
+    lowering = LoweringPass()
+    lowering.variables.update(variables)
+    return lowering.lower(ast_from_expr(code))
+
+
 def test_lowering_literal():
     assert LoweringPass().lower(ast_from_expr("1;")) == [
         LoadConstant("%0", 1),
@@ -23,44 +40,110 @@ def test_lowering_literal():
 
 
 def test_lowering_identifier():
-    assert LoweringPass().lower(ast_from_expr("a;")) == []
+    assert lower_expr("a;", a="%a") == []
 
 
 def test_lowering_unary_operation():
-    assert LoweringPass().lower(ast_from_expr("-c;")) == [
-        UnaryOperation(op="-", var="c"),
+    assert lower_expr("-c;", c="%c") == [
+        Negate("%0", "%c"),
     ]
 
 
 def test_lowering_binary_operation():
-    assert LoweringPass().lower(ast_from_expr("b * c;")) == [
-        BinaryOperation("%0", "*", "b", "c"),
+    assert lower_expr("b * c;", b="%b", c="%c") == [
+        BinaryOperation("%0", "*", "%b", "%c"),
     ]
 
 
 def test_lowering_decleration():
     assert LoweringPass().lower(ast_from_code("let a = 1;")) == [
         LoadConstant("%0", 1),
-        LoadVariable("a", "%0"),
+        LoadVariable("%1", "%0"),
     ]
 
 
 def test_lowering_decleration_with_unary_op():
     assert LoweringPass().lower(ast_from_code("let a = -1;")) == [
         LoadConstant("%0", 1),
-        UnaryOperation("-", "%0"),
-        LoadVariable("a", "%0"),
+        Negate("%1", "%0"),
+        LoadVariable("%2", "%1"),
     ]
 
 
 def test_lowering_assignment():
-    assert LoweringPass().lower(ast_from_code("a = b * c;")) == [
-        BinaryOperation("%0", "*", "b", "c"),
-        LoadVariable("a", "%0"),
+    assert LoweringPass().lower(ast_from_code("let a = 1; a = a * a; return a;")) == [
+        LoadConstant("%0", 1),
+        LoadVariable("%1", "%0"),
+        BinaryOperation("%2", "*", "%1", "%1"),
+        LoadVariable("%3", "%2"),
+        Return("%3"),
+    ]
+
+
+def test_negation_defines_a_new_value():
+    assert LoweringPass().lower(ast_from_code("let a = 1; let b = -a; return a;")) == [
+        LoadConstant("%0", 1),
+        LoadVariable("%1", "%0"),
+        Negate("%2", "%1"),
+        LoadVariable("%3", "%2"),
+        Return("%1"),
     ]
 
 
-def test_lowering_return():
-    assert LoweringPass().lower(ast_from_code("return c;")) == [
-        Return("c"),
+def test_lowering_deeply_nested_expression():
+    depth = 100_000
+    code = "let a = 1; return " + "-(" * depth + "a" + ")" * depth + ";"
+    ir = LoweringPass().lower(ast_from_code(code))
+    assert len(ir) == depth + 3
+    assert ir[2] == Negate("%2", "%1")
+    assert ir[-1] == Return(f"%{depth + 1}")
+    verify(ir)
+
+
+def test_lowered_ir_is_verified():
+    code = "let a = 1; let b = a + 2 * a; a = -b / (a - 1); return a + b;"
+    verify(LoweringPass().lower(ast_from_code(code)))
+
+
+def test_verify_redefinition():
+    with pytest.raises(VerificationError):
+        verify([LoadConstant("%0", 1), LoadConstant("%0", 2)])
+
+
+def test_verify_use_before_definition():
+    with pytest.raises(VerificationError):
+        verify([Negate("%1", "%0"), LoadConstant("%0", 2)])
+
+
+def test_def_use_chains():
+    ir = LoweringPass().lower(ast_from_code("let a = 1; return a * a;"))
+    def_use = DefUse(ir)
+    assert def_use.definition("%1") == LoadVariable("%1", "%0")
+    assert def_use.uses_of("%1") == [2, 2]
+    assert def_use.uses_of("%2") == [3]
+    assert def_use.last_use("%0") == 1
+
+
+def test_sethi_ullman_labels():
+    expr = ast_from_expr("(a - b) * c;")[0]
+    labels = sethi_ullman_labels(expr)
+    assert labels[id(expr.lhs)] == 2
+    assert labels[id(expr.rhs)] == 1
+    assert labels[id(expr)] == 2
+
+
+def test_sethi_ullman_labels_of_deep_tree():
+    depth = 100_000
+    expr = ast_from_expr("-(" * depth + "a" + ")" * depth + ";")[0]
+    assert sethi_ullman_labels(expr)[id(expr)] == 1
+
+
+def test_heavier_operand_is_lowered_first():
+    assert lower_expr("(a - b) / c;", a="%a", b="%b", c="%c") == [
+        BinaryOperation("%0", "-", "%a", "%b"),
+        BinaryOperation("%1", "/", "%0", "%c"),
+    ]
+    assert lower_expr("a / (b - c);", a="%a", b="%b", c="%c") == [
+        BinaryOperation("%0", "-", "%b", "%c"),
+        BinaryOperation("%1", "/", "%a", "%0"),
     ]
@@ -0,0 +1,29 @@
+import math
+
+from bench_compile import compare, measure, scaling_exponent, sizes_up_to
+from program_generator import ProgramShape
+
+
+def test_scaling_exponent():
+    sizes = [100, 1000, 10000]
+    assert math.isclose(scaling_exponent(sizes, [1e-3, 1e-2, 1e-1]), 1)
+    assert math.isclose(scaling_exponent(sizes, [1e-3, 1e-1, 10]), 2)
+
+
+def test_sizes_up_to():
+    assert sizes_up_to(1_000_000) == [100, 1000, 10_000, 100_000, 1_000_000]
+
+
+def test_measure():
+    measurement = measure(ProgramShape(statements=100), opt_level=1)
+    assert measurement.tokens > measurement.nodes > 100
+    assert list(measurement.passes)[:2] == ["lex", "parse"]
+
+
+def test_compare_flags_slower_totals(capsys):
+    def results(seconds):
+        return {"measurements": [{"statements": 100, "passes": {"lex": seconds}}]}
+
+    assert compare(results(1.0), results(1.5), threshold=0.1)
+    assert not compare(results(1.0), results(1.05), threshold=0.1)
+    assert "REGRESSION" in capsys.readouterr().out
@@ -0,0 +1,69 @@
+from lexing import Tokenizer
+from parsing import Parser
+from ast_lowering import LoweringPass
+from code_gen import CodeGen
+from testutils import deep_left_expression, high_pressure_program
+
+
+def code_gen(code: str) -> CodeGen:
+    ir = LoweringPass().lower(Parser().parse(Tokenizer().tokenize(code)))
+    generator = CodeGen()
+    generator.code_gen(ir)
+    return generator
+
+
+def test_no_frame_without_spills():
+    generator = code_gen("let a = 1; let b = 2; return a * b;")
+    assert generator.frame_report() == {
+        "frame_bytes": 0,
+        "spilled_values": 0,
+        "stack_slots": 0,
+        "saved_registers": 0,
+    }
+
+
+def test_frame_scales_with_peak_live_values():
+    short = code_gen(high_pressure_program(1)).frame_report()
+    long = code_gen(high_pressure_program(50)).frame_report()
+    assert long["spilled_values"] > short["spilled_values"] > 0
+    assert long["stack_slots"] == short["stack_slots"]
+    assert long["frame_bytes"] == short["frame_bytes"]
+
+
+def test_frame_is_aligned():
+    for blocks in range(1, 4):
+        generator = code_gen(high_pressure_program(blocks, values=15 + blocks))
+        assert generator.frame_report()["frame_bytes"] % CodeGen.STACK_ALIGNMENT == 0
+
+
+def test_copies_are_coalesced():
+    generator = code_gen("let a = 1; let b = a; let c = -b; let d = c - 2; return d;")
+    moves = [
+        line
+        for line in generator.output
+        if line.startswith("mov %") and "%rbp" not in line
+    ]
+    # Only the move of the result into the printf argument is left
+    assert moves == ["mov %rcx, %rsi"]
+
+
+def test_constants_are_immediate_operands():
+    generator = code_gen("let a = 1; let b = a + 2; let c = 3 - b; return c * 4;")
+    assert "add $2, %rcx" in generator.output
+    assert "mov $2, %rcx" not in generator.output
+    assert not any(line.startswith("mov $4") for line in generator.output)
+
+
+def test_wide_constants_are_loaded():
+    generator = code_gen("let a = 1; return a + 10000000000;")
+    assert any(line.startswith("mov $10000000000, %") for line in generator.output)
+
+
+def test_trapping_divisor_is_loaded():
+    generator = code_gen("let a = 1; return a / 0;")
+    assert any(line.startswith("mov $0, %") for line in generator.output)
+    assert any(line.startswith("idiv %") for line in generator.output)
+
+
+def test_deep_left_expression_does_not_spill():
+    assert code_gen(deep_left_expression(200)).frame_report()["spilled_values"] == 0
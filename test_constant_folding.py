@@ -0,0 +1,88 @@
+from parsing import Parser
+from lexing import Tokenizer
+from ast_lowering import LoweringPass
+from constant_folding import ConstantFoldingPass, truncating_division, wrap_int64
+from ir import LoadConstant, LoadVariable, BinaryOperation, Negate, Return
+
+
+def fold(code: str):
+    ast = Parser().parse(Tokenizer().tokenize(code))
+    return ConstantFoldingPass().fold(LoweringPass().lower(ast))
+
+
+# "%x" stands for a value unknown at compile time
+
+
+def test_fold_expression():
+    assert fold("return 2 * 3 + 5;") == [LoadConstant("%4", 11), Return("%4")]
+
+
+def test_fold_negation():
+    assert fold("return -(2 - 5);") == [LoadConstant("%3", 3), Return("%3")]
+
+
+def test_propagate_through_variables():
+    assert fold("let a = 4; let b = a * a; a = b / 3; return a;") == [
+        LoadConstant("%6", 5),
+        Return("%6"),
+    ]
+
+
+def test_materialize_before_unknown_use():
+    ir = [
+        LoadConstant("%0", 2),
+        Negate("%1", "%0"),
+        BinaryOperation("%2", "+", "%x", "%1"),
+        BinaryOperation("%3", "-", "%2", "%1"),
+        Return("%3"),
+    ]
+    assert ConstantFoldingPass().fold(ir) == [
+        LoadConstant("%1", -2),
+        BinaryOperation("%2", "+", "%x", "%1"),
+        BinaryOperation("%3", "-", "%2", "%1"),
+        Return("%3"),
+    ]
+
+
+def test_identities():
+    ir = [
+        LoadConstant("%0", 0),
+        LoadConstant("%1", 1),
+        BinaryOperation("%2", "*", "%x", "%1"),
+        BinaryOperation("%3", "+", "%0", "%x"),
+        BinaryOperation("%4", "/", "%x", "%1"),
+        BinaryOperation("%5", "*", "%x", "%0"),
+        Return("%5"),
+    ]
+    assert ConstantFoldingPass().fold(ir) == [
+        LoadVariable("%2", "%x"),
+        LoadVariable("%3", "%x"),
+        LoadVariable("%4", "%x"),
+        LoadConstant("%5", 0),
+        Return("%5"),
+    ]
+
+
+def test_unknown_negation_is_kept():
+    ir = [Negate("%0", "%x"), Return("%0")]
+    assert ConstantFoldingPass().fold(ir) == ir
+
+
+def test_division_by_zero_is_not_folded():
+    assert fold("return 1 / 0;") == [
+        LoadConstant("%1", 1),
+        LoadConstant("%0", 0),
+        BinaryOperation("%2", "/", "%1", "%0"),
+        Return("%2"),
+    ]
+
+
+def test_truncating_division():
+    assert truncating_division(-7, 2) == -3
+    assert truncating_division(7, -2) == -3
+    assert truncating_division(-(1 << 63), -1) is None
+
+
+def test_wrap_int64():
+    assert wrap_int64(1 << 63) == -(1 << 63)
+    assert wrap_int64(-1) == -1
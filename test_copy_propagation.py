@@ -0,0 +1,30 @@
+from parsing import Parser
+from lexing import Tokenizer
+from ast_lowering import LoweringPass
+from copy_propagation import CopyPropagation
+from ir import LoadConstant, BinaryOperation, Negate, Return
+
+
+def propagate(code: str):
+    ir = LoweringPass().lower(Parser().parse(Tokenizer().tokenize(code)))
+    propagation = CopyPropagation()
+    return propagation.propagate(ir), propagation.eliminated
+
+
+def test_chain_of_copies():
+    assert propagate("let a = 1; let b = a; let c = b; return c;") == (
+        [LoadConstant("%0", 1), Return("%0")],
+        3,
+    )
+
+
+def test_uses_refer_to_source():
+    assert propagate("let a = 2; a = -a; return a * a;") == (
+        [
+            LoadConstant("%0", 2),
+            Negate("%2", "%0"),
+            BinaryOperation("%4", "*", "%2", "%2"),
+            Return("%4"),
+        ],
+        2,
+    )
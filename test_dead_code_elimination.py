@@ -0,0 +1,53 @@
+from parsing import Parser
+from lexing import Tokenizer
+from ast_lowering import LoweringPass
+from dead_code_elimination import DeadCodeElimination
+from ir import LoadConstant, LoadVariable, BinaryOperation, Negate, Return
+
+
+def lower(code: str):
+    return LoweringPass().lower(Parser().parse(Tokenizer().tokenize(code)))
+
+
+def test_unreachable_after_return():
+    dce = DeadCodeElimination()
+    assert dce.eliminate(lower("return 1; return 2;")) == [
+        LoadConstant("%0", 1),
+        Return("%0"),
+    ]
+    assert dce.statistics() == {"dce.unreachable": 2, "dce.dead": 0}
+
+
+def test_unused_decleration():
+    dce = DeadCodeElimination()
+    assert dce.eliminate(lower("let a = 1 + 2; let b = 3; return b;")) == [
+        LoadConstant("%4", 3),
+        LoadVariable("%5", "%4"),
+        Return("%5"),
+    ]
+    assert dce.statistics() == {"dce.unreachable": 0, "dce.dead": 4}
+
+
+def test_overwritten_assignment():
+    assert DeadCodeElimination().eliminate(lower("let a = 1; a = -2; return a;")) == [
+        LoadConstant("%2", 2),
+        Negate("%3", "%2"),
+        LoadVariable("%4", "%3"),
+        Return("%4"),
+    ]
+
+
+def test_used_values_are_kept():
+    ir = lower("let a = 2; let b = a * a; return b - a;")
+    assert DeadCodeElimination().eliminate(ir) == ir
+
+
+def test_chain_of_dead_values():
+    ir = [
+        LoadConstant("%0", 1),
+        Negate("%1", "%0"),
+        BinaryOperation("%2", "+", "%1", "%0"),
+        LoadConstant("%3", 1),
+        Return("%3"),
+    ]
+    assert DeadCodeElimination().eliminate(ir) == [LoadConstant("%3", 1), Return("%3")]
@@ -0,0 +1,64 @@
+import pytest
+
+from dispatch import dispatchmethod
+
+
+class Base:
+    pass
+
+
+class Derived(Base):
+    pass
+
+
+class Other:
+    pass
+
+
+class Visitor:
+    @dispatchmethod
+    def visit(self, node):
+        return "default"
+
+    @visit.register
+    def visit_base(self, node: Base):
+        return "base"
+
+    @visit.register(int)
+    @visit.register(str)
+    def visit_scalar(self, node, suffix=""):
+        return "scalar" + suffix
+
+
+def test_dispatch_by_annotation():
+    assert Visitor().visit(Base()) == "base"
+
+
+def test_dispatch_through_mro():
+    assert Visitor().visit(Derived()) == "base"
+
+
+def test_dispatch_default():
+    assert Visitor().visit(Other()) == "default"
+
+
+def test_stacked_registration():
+    assert Visitor().visit(1) == "scalar"
+    assert Visitor().visit("a", suffix="!") == "scalar!"
+
+
+def test_handlers_stay_plain_methods():
+    assert Visitor().visit_base(Other()) == "base"
+
+
+def test_missing_annotation():
+    with pytest.raises(TypeError):
+
+        class Invalid:
+            @dispatchmethod
+            def visit(self, node):
+                pass
+
+            @visit.register
+            def _(self, node):
+                pass
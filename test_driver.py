@@ -0,0 +1,87 @@
+import os
+import subprocess
+
+import pytest
+
+from driver import BuildJob, build, expand_manifests, output_path
+
+
+def write(path, content: str) -> str:
+    path.write_text(content)
+    return str(path)
+
+
+def run_binary(path: str) -> int:
+    return int(subprocess.run([path], capture_output=True, check=True).stdout)
+
+
+def test_build_in_parallel(tmp_path):
+    paths = [
+        write(tmp_path / f"p{i}.kal", f"let a = {i}; return a * 3;") for i in range(20)
+    ]
+    jobs = [BuildJob(path, output_path(path, None), backend="native") for path in paths]
+    results = build(jobs, workers=2)
+    assert [result.path for result in results] == paths
+    assert all(result.error is None for result in results)
+    assert [run_binary(job.bin_out) for job in jobs] == [i * 3 for i in range(20)]
+
+
+def test_errors_are_collected_per_file(tmp_path):
+    good = write(tmp_path / "good.kal", "return 1;")
+    undeclared = write(tmp_path / "undeclared.kal", "return a;")
+    missing = str(tmp_path / "missing.kal")
+    empty = write(tmp_path / "empty.kal", "")
+    blank = write(tmp_path / "blank.kal", " \n\t\n")
+    jobs = [
+        BuildJob(path, output_path(path, None), backend="native")
+        for path in [undeclared, good, missing, empty, blank]
+    ]
+    results = build(jobs, workers=2)
+    assert "Undeclared variable" in results[0].error
+    assert results[1].error is None
+    assert "Error reading" in results[2].error
+    assert "Expected a program" in results[3].error
+    assert "Expected a program" in results[4].error
+    assert os.path.exists(jobs[1].bin_out)
+
+
+def test_too_wide_constant(tmp_path):
+    path = write(tmp_path / "wide.kal", "return 99999999999999999999999;")
+    (result,) = build([BuildJob(path, output_path(path, None), backend="native")])
+    assert "Error assembling" in result.error
+    assert not os.path.exists(output_path(path, None))
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_undecodable_file_fails_alone(tmp_path, workers):
+    good = write(tmp_path / "good.kal", "return 1;")
+    undecodable = tmp_path / "undecodable.kal"
+    undecodable.write_bytes(b"return \xff;")
+    jobs = [
+        BuildJob(path, output_path(path, None), backend="native")
+        for path in [str(undecodable), good]
+    ]
+    results = build(jobs, workers)
+    assert "Error reading" in results[0].error
+    assert results[1].error is None
+
+
+def test_build_with_gcc(tmp_path):
+    path = write(tmp_path / "p.kal", "return 7 / 2;")
+    (result,) = build([BuildJob(path, output_path(path, None))])
+    assert result.error is None
+    assert run_binary(output_path(path, None)) == 3
+
+
+def test_output_path():
+    assert output_path("src/a.kal", None) == "src/a"
+    assert output_path("src/a.kal", "bin") == os.path.join("bin", "a")
+
+
+def test_manifest(tmp_path):
+    (tmp_path / "manifest").write_text("a.kal\n\n# skipped\nsub/b.kal\n")
+    assert expand_manifests(["c.kal", f"@{tmp_path / 'manifest'}"]) == [
+        "c.kal",
+        str(tmp_path / "a.kal"),
+        str(tmp_path / "sub" / "b.kal"),
+    ]
@@ -0,0 +1,92 @@
+import pytest
+
+from constant_folding import truncating_division, wrap_int64
+from instruction_selection import (
+    WORD_BITS,
+    multiply_by_constant,
+    signed_division_magic,
+    divide_by_constant,
+)
+
+INT64_MIN = -(1 << 63)
+INT64_MAX = (1 << 63) - 1
+NUMERATORS = [
+    0,
+    1,
+    -1,
+    2,
+    -2,
+    7,
+    -7,
+    1000003,
+    -1000003,
+    INT64_MAX,
+    INT64_MIN,
+    INT64_MIN + 1,
+]
+DIVISORS = [2, 3, 5, 6, 7, 10, 100, 641, 1 << 40, INT64_MAX, -2, -3, -7, -10, INT64_MIN]
+
+
+def magic_division(numerator: int, divisor: int) -> int:
+    """The non power of two sequence of divide_by_constant, in Python"""
+    magic, shift = signed_division_magic(divisor)
+    high = (magic * numerator) >> WORD_BITS
+    if divisor > 0 and magic < 0:
+        high = wrap_int64(high + numerator)
+    elif divisor < 0 and magic > 0:
+        high = wrap_int64(high - numerator)
+    high >>= shift
+    return wrap_int64(high + ((high & ((1 << WORD_BITS) - 1)) >> (WORD_BITS - 1)))
+
+
+@pytest.mark.parametrize("divisor", DIVISORS)
+def test_magic_division_truncates(divisor):
+    for numerator in NUMERATORS:
+        assert magic_division(numerator, divisor) == wrap_int64(
+            truncating_division(numerator, divisor)
+        ), numerator
+
+
+def test_known_magic_numbers():
+    assert signed_division_magic(3) == (0x5555555555555556, 0)
+    assert signed_division_magic(7) == (0x4924924924924925, 1)
+
+
+def test_multiply_by_power_of_two():
+    assert multiply_by_constant("%rcx", "%rsi", 8) == [
+        "mov %rsi, %rcx",
+        "shl $3, %rcx",
+    ]
+
+
+def test_multiply_by_lea_multiplier():
+    assert multiply_by_constant("%rcx", "%rsi", 9) == ["lea (%rsi,%rsi,8), %rcx"]
+
+
+def test_multiply_memory_by_lea_multiplier():
+    assert multiply_by_constant("%rcx", "8(%rsp)", 3) == ["imul $3, 8(%rsp), %rcx"]
+
+
+def test_multiply_by_one_in_place():
+    assert multiply_by_constant("%rcx", "%rcx", 1) == []
+
+
+def test_multiply_by_wide_constant():
+    assert multiply_by_constant("%rcx", "%rsi", 1 << 40 | 1) is None
+
+
+def test_divide_by_power_of_two():
+    assert divide_by_constant("%rcx", -4) == [
+        "mov %rcx, %rax",
+        "cqo",
+        "shr $62, %rdx",
+        "add %rdx, %rax",
+        "sar $2, %rax",
+        "neg %rax",
+    ]
+
+
+def test_divide_memory_by_constant():
+    lines = divide_by_constant("8(%rsp)", 7)
+    assert lines[:2] == ["mov $5270498306774157605, %rax", "imulq 8(%rsp)"]
+    assert "idiv" not in "\n".join(lines)
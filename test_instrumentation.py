@@ -0,0 +1,109 @@
+import json
+import tracemalloc
+
+import pytest
+
+from compiler import compile_source
+from errors import CompilationError
+from commands import compile_command
+from instrumentation import Instrumentation, count_nodes
+from lexing import Tokenizer
+from parsing import Parser
+
+PROGRAM = "let a = 6; let b = a * 7; return b - 1;"
+
+
+def pass_names(instrumentation: Instrumentation) -> list:
+    return [record.name for record in instrumentation.passes]
+
+
+def test_records_every_pass():
+    instrumentation = Instrumentation()
+    compile_source(PROGRAM, opt_level=1, instrumentation=instrumentation)
+    assert pass_names(instrumentation) == [
+        "lex",
+        "parse",
+        "analyze",
+        "lower",
+        "optimize",
+        "verify",
+        "codegen",
+        "peephole",
+    ]
+    records = {record.name: record for record in instrumentation.passes}
+    assert records["lex"].items == {"tokens": 17}
+    assert records["parse"].items == {"nodes": 10}
+    assert records["codegen"].items["spills"] == 0
+    assert all(record.seconds > 0 for record in instrumentation.passes)
+    assert records["lower"].peak_bytes > 0
+    assert "cse.eliminated" in instrumentation.statistics
+
+
+def test_streaming_counts_tokens():
+    instrumentation = Instrumentation(trace_memory=False)
+    compile_source(PROGRAM, instrumentation=instrumentation, streaming=True)
+    (lex_and_parse,) = instrumentation.passes[:1]
+    assert lex_and_parse.name == "lex+parse"
+    assert lex_and_parse.items == {"tokens": 17, "nodes": 10}
+    assert lex_and_parse.peak_bytes == 0
+
+
+def test_disabled_records_nothing():
+    instrumentation = Instrumentation(enabled=False)
+    compile_source(PROGRAM, instrumentation=instrumentation)
+    assert instrumentation.passes == []
+
+
+def test_passes_before_an_error_are_kept():
+    instrumentation = Instrumentation()
+    with pytest.raises(CompilationError):
+        compile_source("return a;", instrumentation=instrumentation)
+    assert pass_names(instrumentation) == ["lex", "parse"]
+
+
+def test_count_nodes_of_deep_expressions():
+    ast = Parser().parse(Tokenizer().tokenize("return " + "1 + " * 5000 + "1;"))
+    assert count_nodes(ast) == 1 + 5000 * 2 + 1
+
+
+def test_table_and_json(tmp_path, capsys):
+    source = tmp_path / "program.kal"
+    source.write_text(PROGRAM)
+    stats = tmp_path / "stats.json"
+    compile_command(
+        str(source),
+        str(tmp_path / "a.out"),
+        0,
+        "native",
+        time_passes=True,
+        stats_json=str(stats),
+    )
+    table = capsys.readouterr().err
+    assert "codegen" in table and "link (native)" in table
+    report = json.loads(stats.read_text())
+    assert [record["name"] for record in report["passes"]][0] == "read"
+    assert report["peak_bytes"] == max(
+        record["peak_bytes"] for record in report["passes"]
+    )
+    assert report["total_seconds"] > 0
+
+
+def test_times_are_untraced(tmp_path, monkeypatch):
+    now = 0.0
+
+    def clock():
+        # Passes seem a hundred times slower when memory is traced
+        nonlocal now
+        now += 100 if tracemalloc.is_tracing() else 1
+        return now
+
+    monkeypatch.setattr("instrumentation.perf_counter", clock)
+    source = tmp_path / "program.kal"
+    source.write_text(PROGRAM)
+    stats = tmp_path / "stats.json"
+    compile_command(
+        str(source), str(tmp_path / "a.out"), 0, "native", stats_json=str(stats)
+    )
+    report = json.loads(stats.read_text())
+    assert all(record["seconds"] == 1 for record in report["passes"])
+    assert all(record["peak_bytes"] > 0 for record in report["passes"])
@@ -0,0 +1,52 @@
+import pytest
+
+from assembler import AssemblerError
+from jit import JitCodeGen, jit_compile, run
+from compiler import compile_source
+from optimization import MAX_OPT_LEVEL
+
+OPT_LEVELS = range(MAX_OPT_LEVEL + 1)
+
+
+@pytest.mark.parametrize("opt_level", OPT_LEVELS)
+def test_run(opt_level):
+    assert run("let a = 6; let b = a * 7; return b - 1;", opt_level) == 41
+
+
+@pytest.mark.parametrize("opt_level", OPT_LEVELS)
+def test_full_width_result(opt_level):
+    assert run("let a = 3000000000; return a * 4;", opt_level) == 12000000000
+
+
+@pytest.mark.parametrize("opt_level", OPT_LEVELS)
+@pytest.mark.parametrize(
+    "code", ["return 1 / 0;", "let a = 2; let b = a - 2; return a / b;"]
+)
+def test_division_by_zero(code, opt_level):
+    with pytest.raises(ZeroDivisionError):
+        run(code, opt_level)
+
+
+@pytest.mark.parametrize("opt_level", OPT_LEVELS)
+def test_division_by_minus_one(opt_level):
+    assert run("let a = 5; let b = 0 - 1; return a / b;", opt_level) == -5
+    code = "let a = 0 - 9223372036854775807; a = a - 1; let b = 0 - 1; return a / b;"
+    assert run(code, opt_level) == -(1 << 63)
+
+
+def test_function_can_be_called_again():
+    function = jit_compile(
+        compile_source("let a = 2; return a * a;", code_gen=JitCodeGen())
+    )
+    assert [function() for _ in range(3)] == [4, 4, 4]
+    function.close()
+
+
+def test_too_wide_constant():
+    with pytest.raises(AssemblerError):
+        run("return 99999999999999999999999;")
+
+
+def test_no_printf():
+    lines = compile_source("return 1;", code_gen=JitCodeGen())
+    assert "call printf" not in lines
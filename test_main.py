@@ -0,0 +1,60 @@
+import os
+import subprocess
+import sys
+
+import cli
+from main import COMMANDS, parse_fast_path, with_command
+
+
+def test_compile():
+    assert parse_fast_path(
+        ["compile", "a.kal", "-o", "a", "-O1", "--backend=native"]
+    ) == (
+        "compile",
+        {"path": "a.kal", "bin_out": "a", "opt_level": 1, "backend": "native"},
+    )
+
+
+def test_defaults():
+    assert parse_fast_path(["compile", "a.kal"]) == (
+        "compile",
+        {"path": "a.kal", "bin_out": "a.out", "opt_level": 0, "backend": "gcc"},
+    )
+    assert parse_fast_path(["run", "--jit", "a.kal", "-O", "1"]) == (
+        "run",
+        {"path": "a.kal", "opt_level": 1, "use_jit": True},
+    )
+
+
+def test_left_to_click():
+    for argv in [
+        [],
+        ["--help"],
+        ["compile", "--help"],
+        ["compile", "a.kal", "--server", "kalkar.sock"],
+        ["compile", "a.kal", "b.kal"],
+        ["compile", "a.kal", "-O"],
+        ["compile", "a.kal", "-Ofast"],
+        ["compile", "a.kal", "--backend", "llvm"],
+        ["run", "--jit=yes", "a.kal"],
+        ["build", "a.kal"],
+        ["serve"],
+    ]:
+        assert parse_fast_path(argv) is None, argv
+
+
+def test_compile_without_command():
+    assert COMMANDS == list(cli.main.commands)
+    assert with_command(["a.kal", "-o", "a"]) == ["compile", "a.kal", "-o", "a"]
+    assert with_command(["-O1", "a.kal"]) == ["compile", "-O1", "a.kal"]
+    for argv in [[], ["--help"], ["run", "a.kal"], ["compile", "a.kal"]]:
+        assert with_command(argv) == argv
+
+
+def test_old_invocation(tmp_path):
+    source = tmp_path / "program.kal"
+    source.write_text("return 6 * 7;")
+    main = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+    binary = str(tmp_path / "program")
+    subprocess.run([sys.executable, main, str(source), "-o", binary], check=True)
+    assert subprocess.run([binary], capture_output=True).stdout == b"42\n"
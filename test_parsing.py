@@ -3,6 +3,7 @@ import pytest
 from parsing import Parser, UnexpectedTokenError, ExpectedTokenError
 from ast_ import BinaryOperation, UnaryOperation, Assignment, Return, Decleration
 from lexing import Tokenizer, Identifier, Literal, Operator, Seperator
+from token_stream import EndOfInputError
 
 
 def test_expression_single_operand():
@@ -195,3 +196,76 @@ def test_decleration_without_expression():
 def test_variable_decleration():
     tokens = Tokenizer().tokenize("let a = 1;")
     assert Parser().parse(tokens) == [Decleration(Identifier("a"), Literal("1"))]
+
+
+def test_streaming_parse_matches_materialized():
+    code = "let a = 1; let b = (a + 2) * -a; b = b / 3; return a - b;"
+    assert Parser().parse(Tokenizer().stream(code)) == Parser().parse(
+        Tokenizer().tokenize(code)
+    )
+
+
+def test_streaming_end_of_input():
+    tokens = Tokenizer().stream("let a = 1")
+    with pytest.raises(EndOfInputError) as excinfo:
+        Parser().parse(tokens)
+    assert excinfo.value.position.start == 8
+
+
+def test_order_of_operations_long_chain():
+    tokens = Tokenizer().tokenize("1 - 2 * 3 / 4 + 5 * 6;")
+    assert Parser().parse_expression(tokens) == BinaryOperation(
+        BinaryOperation(
+            Literal("1"),
+            Operator("-"),
+            BinaryOperation(
+                BinaryOperation(Literal("2"), Operator("*"), Literal("3")),
+                Operator("/"),
+                Literal("4"),
+            ),
+        ),
+        Operator("+"),
+        BinaryOperation(Literal("5"), Operator("*"), Literal("6")),
+    )
+
+
+def test_non_binary_operator_in_expression():
+    tokens = Tokenizer().tokenize("1 = 2;")
+    with pytest.raises(ExpectedTokenError) as excinfo:
+        Parser().parse_expression(tokens)
+    assert excinfo.value.unexpected == Operator("=")
+
+
+def test_expression_with_many_operators():
+    terms = 50_000
+    tokens = Tokenizer().tokenize(" + ".join(["1 * 2"] * terms) + ";")
+    root = Parser().parse_expression(tokens)
+    additions = 0
+    while type(root) is BinaryOperation and root.operator == Operator("+"):
+        assert root.rhs == BinaryOperation(Literal("1"), Operator("*"), Literal("2"))
+        additions += 1
+        root = root.lhs
+    assert additions == terms - 1
+    assert root == BinaryOperation(Literal("1"), Operator("*"), Literal("2"))
+
+
+DEEP_NESTING = 100_000
+
+
+def test_deeply_nested_unary_operations():
+    tokens = Tokenizer().tokenize("-" * DEEP_NESTING + "1;")
+    node = Parser().parse_expression(tokens)
+    for _ in range(DEEP_NESTING):
+        assert type(node) is UnaryOperation
+        node = node.operand
+    assert node == Literal("1")
+
+
+def test_deeply_nested_parenthesis():
+    code = "(" * DEEP_NESTING + "1 + 2" + ")" * DEEP_NESTING + " * 3;"
+    tokens = Tokenizer().tokenize(code)
+    assert Parser().parse_expression(tokens) == BinaryOperation(
+        BinaryOperation(Literal("1"), Operator("+"), Literal("2")).parenthesize(),
+        Operator("*"),
+        Literal("3"),
+    )
@@ -0,0 +1,80 @@
+from compiler import compile_source
+from peephole import PeepholeOptimizer, parse
+from testutils import high_pressure_program, run_instructions
+
+
+def optimize(*lines: str):
+    optimizer = PeepholeOptimizer()
+    return optimizer.optimize(list(lines)), optimizer.statistics()
+
+
+def test_parse_address_operands():
+    assert parse("lea (%rsi,%rsi,2), %rcx") == ("lea", ["(%rsi,%rsi,2)", "%rcx"])
+    assert parse("mov  %rsp, %rbp") == ("mov", ["%rsp", "%rbp"])
+    assert parse("cqo") == ("cqo", [])
+
+
+def test_self_move():
+    lines, statistics = optimize("mov %rcx, %rcx", "ret")
+    assert lines == ["ret"]
+    assert statistics["peephole.self-move"] == 1
+
+
+def test_store_followed_by_load():
+    lines, statistics = optimize("mov %rax, 8(%rsp)", "mov 8(%rsp), %rbx")
+    assert lines == ["mov %rax, 8(%rsp)", "mov %rax, %rbx"]
+    assert statistics["peephole.store-load"] == 1
+
+
+def test_move_back():
+    lines, _ = optimize("mov %rax, 8(%rsp)", "mov 8(%rsp), %rax")
+    assert lines == ["mov %rax, 8(%rsp)"]
+
+
+def test_load_from_address_of_overwritten_register():
+    lines, _ = optimize("mov 8(%rax), %rax", "mov %rax, %rcx")
+    assert lines == ["mov 8(%rax), %rax", "mov %rax, %rcx"]
+
+
+def test_dead_store():
+    lines, statistics = optimize("mov %rcx, 8(%rsp)", "movq $1, 8(%rsp)")
+    assert lines == ["movq $1, 8(%rsp)"]
+    assert statistics["peephole.dead-store"] == 1
+
+
+def test_store_read_by_next_store_is_kept():
+    lines, _ = optimize("mov %rcx, %rax", "mov 8(%rax), %rax")
+    assert lines == ["mov %rcx, %rax", "mov 8(%rax), %rax"]
+
+
+def test_zero_register():
+    lines, _ = optimize("mov $0, %r8", "mov $0, %eax", "movq $0, 8(%rsp)")
+    assert lines == ["xor %r8d, %r8d", "xor %eax, %eax", "movq $0, 8(%rsp)"]
+
+
+def test_rewrites_enable_earlier_matches():
+    lines, statistics = optimize("mov %rcx, %rsi", "add $0, %rsi", "mov %rsi, %rcx")
+    assert lines == ["mov %rcx, %rsi"]
+    assert statistics["peephole.add-zero"] == 1
+    assert statistics["peephole.store-load"] == 1
+
+
+def test_labels_and_directives_are_kept():
+    lines, _ = optimize(".global main", "main:", "mov $0, %rax")
+    assert lines == [".global main", "main:", "xor %eax, %eax"]
+
+
+def test_optimized_program_runs():
+    lines = compile_source(high_pressure_program(3), 0)
+    optimizer = PeepholeOptimizer()
+    optimized = optimizer.optimize(lines)
+    assert len(optimized) < len(lines)
+    assert run_instructions(optimized) == run_instructions(lines)
+
+
+def test_enabled_by_opt_level():
+    statistics = {}
+    compile_source("return 0;", 0, statistics)
+    assert not any(name.startswith("peephole.") for name in statistics)
+    compile_source("return 0;", 1, statistics)
+    assert statistics["peephole.zero-register"] == 3
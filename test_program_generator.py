@@ -0,0 +1,43 @@
+import pytest
+
+import jit
+from compiler import compile_source
+from program_generator import ProgramShape, generate_program
+
+
+def test_same_seed_same_program():
+    assert generate_program(ProgramShape(seed=3)) == generate_program(
+        ProgramShape(seed=3)
+    )
+    assert generate_program(ProgramShape(seed=3)) != generate_program(
+        ProgramShape(seed=4)
+    )
+
+
+def test_statement_count():
+    program = generate_program(ProgramShape(statements=50))
+    assert program.count(";") == 51
+    assert program.splitlines()[-1].startswith("return")
+
+
+def test_no_reuse_only_declares():
+    program = generate_program(ProgramShape(statements=50, reuse=0))
+    assert all(line.startswith(("let", "return")) for line in program.splitlines())
+
+
+def test_shape_knobs():
+    flat = generate_program(ProgramShape(parentheses=0, negation=0, operators={"*": 1}))
+    assert "(" not in flat and "-" not in flat and "+" not in flat
+    nested = generate_program(ProgramShape(depth=6, parentheses=1, negation=1))
+    assert "(" in nested and "-(" in nested
+
+
+def test_empty_program():
+    assert generate_program(ProgramShape(statements=0)) == "return 0;"
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_programs_compile_and_run(seed):
+    program = generate_program(ProgramShape(statements=30, depth=4, seed=seed))
+    compile_source(program, opt_level=1)
+    assert jit.run(program, opt_level=0) == jit.run(program, opt_level=1)
@@ -0,0 +1,66 @@
+from liveness import LiveInterval, live_intervals
+from register_allocation import LinearScanAllocator
+from ir import LoadConstant, LoadVariable, BinaryOperation, Return
+
+
+def test_live_intervals():
+    ir = [
+        LoadConstant("%0", 1),
+        LoadConstant("%1", 2),
+        BinaryOperation("%2", "+", "%0", "%1"),
+        LoadVariable("%3", "%0"),
+        Return("%2"),
+    ]
+    assert live_intervals(ir) == [
+        LiveInterval("%0", 0, 3),
+        LiveInterval("%1", 1, 2),
+        LiveInterval("%2", 2, 4),
+        LiveInterval("%3", 3, 3),
+    ]
+
+
+def test_registers_are_reused_after_last_use():
+    allocator = LinearScanAllocator(["a", "b"])
+    assignment = allocator.allocate(
+        [LiveInterval("%0", 0, 1), LiveInterval("%1", 1, 2), LiveInterval("%2", 2, 3)]
+    )
+    assert assignment == {"%0": "a", "%1": "a", "%2": "a"}
+    assert allocator.spilled == set()
+
+
+def test_spill_interval_ending_last():
+    allocator = LinearScanAllocator(["a", "b"])
+    assignment = allocator.allocate(
+        [LiveInterval("%0", 0, 10), LiveInterval("%1", 1, 3), LiveInterval("%2", 2, 4)]
+    )
+    assert assignment == {"%1": "b", "%2": "a"}
+    assert allocator.spilled == {"%0"}
+
+
+def test_spill_current_interval_when_ending_last():
+    allocator = LinearScanAllocator(["a"])
+    assignment = allocator.allocate(
+        [LiveInterval("%0", 0, 3), LiveInterval("%1", 1, 4)]
+    )
+    assert assignment == {"%0": "a"}
+    assert allocator.spilled == {"%1"}
+
+
+def test_clobbered_register_is_avoided():
+    allocator = LinearScanAllocator(["a", "b"], clobbers={"a": [2]})
+    assignment = allocator.allocate(
+        [LiveInterval("%0", 0, 2), LiveInterval("%1", 1, 1), LiveInterval("%2", 2, 3)]
+    )
+    # %2 is defined by the clobbering instruction itself, so it may use "a"
+    assert assignment == {"%0": "b", "%1": "a", "%2": "a"}
+
+
+def test_clobbered_register_is_not_stolen():
+    allocator = LinearScanAllocator(["a", "b"], clobbers={"a": [3]})
+    assignment = allocator.allocate(
+        [LiveInterval("%0", 0, 9), LiveInterval("%1", 1, 2), LiveInterval("%2", 2, 5)]
+    )
+    # "a" is free for %2 but gets clobbered during its lifetime, so "b" is
+    # taken from %0 instead
+    assert assignment == {"%1": "a", "%2": "b"}
+    assert allocator.spilled == {"%0"}
@@ -1,39 +1,40 @@
+import ctypes
 import subprocess
-import tempfile
-import contextlib
 import os
 
 import pytest
 
-from lexing import Tokenizer
-from parsing import Parser
-from semantic_analysis import SemanticAnalyzer
-from ast_lowering import LoweringPass
-from code_gen import CodeGen
+from compiler import compile_source
+from optimization import MAX_OPT_LEVEL
+from constant_folding import truncating_division
+from native import link_executable
+import jit
+from testutils import run_instructions, temp_path
 
 
-@contextlib.contextmanager
-def temp_path():
-    try:
-        yield "./a.out"
-    finally:
-        os.unlink("./a.out")
+def run_native(instructions):
+    with temp_path() as binary_path:
+        with open(binary_path, "wb") as binary:
+            binary.write(link_executable(instructions))
+        os.chmod(binary_path, 0o755)
+        child = subprocess.run([binary_path], capture_output=True, check=True)
+    return int(child.stdout)
 
 
 def compile_and_run(code: str):
-    tokens = Tokenizer().tokenize(code)
-    ast = Parser().parse(tokens)
-    SemanticAnalyzer().analyze(ast)
-    ir = LoweringPass().lower(ast)
-    instructions = CodeGen().code_gen(ir)
-    with tempfile.NamedTemporaryFile(mode="w") as output, temp_path() as binary_path:
-        output.write("\n".join(instructions))
-        output.flush()
-        subprocess.run(
-            ["gcc", "-x", "assembler", output.name, "-o", binary_path], check=True
-        )
-        child = subprocess.run([binary_path], capture_output=True, check=True)
-    return int(child.stdout)
+    """
+    Runs the program at every optimization level, linked by gcc, by the
+    native backend and in process. All of them must agree.
+    """
+    results = {}
+    for opt_level in range(MAX_OPT_LEVEL + 1):
+        instructions = compile_source(code, opt_level)
+        results["gcc", opt_level] = run_instructions(instructions)
+        results["native", opt_level] = run_native(instructions)
+        # printf only prints the low 32 bits
+        results["jit", opt_level] = ctypes.c_int32(jit.run(code, opt_level)).value
+    assert len(set(results.values())) == 1, results
+    return results["gcc", 0]
 
 
 def test_return_literal():
@@ -136,3 +137,91 @@ def test_adding_return_variable():
 
 def test_adding_two_variables():
     assert compile_and_run("let a = 1; let b = 2; let c = a + b; return c;") == 3
+
+
+@pytest.mark.parametrize(
+    "code,expected",
+    [
+        ("return 7 / 2;", 3),
+        ("return -7 / 2;", -3),
+        ("return 7 / -2;", -3),
+        ("return -7 / -2;", 3),
+        ("let a = -7; let b = 2; return a / b;", -3),
+    ],
+)
+def test_division_truncates_towards_zero(code, expected):
+    assert compile_and_run(code) == expected
+
+
+@pytest.mark.parametrize(
+    "code,expected",
+    [
+        ("let a = 3; a = -a; let b = a * 1; return b;", -3),
+        ("let a = 3; a = -a; let b = a + 0; return b;", -3),
+        ("let a = 3; a = -a; let b = a * 0; return b;", 0),
+        ("let a = 3; a = -a; let b = a / 1; return b;", -3),
+    ],
+)
+def test_identities(code, expected):
+    assert compile_and_run(code) == expected
+
+
+def test_operand_outlives_operation():
+    assert compile_and_run("let a = 1; let b = a + 2; return a;") == 1
+
+
+def test_negation_keeps_operand():
+    assert compile_and_run("let a = 3; let b = -a; return a - b;") == 6
+
+
+def test_register_pressure():
+    names = [f"v{i}" for i in range(20)]
+    declerations = " ".join(
+        f"let {name} = {i} * 3 / 2;" for i, name in enumerate(names)
+    )
+    code = f"{declerations} return {' + '.join(names)} * 2 / 3 - v19 / v1;"
+    assert (
+        compile_and_run(code) == sum(i * 3 // 2 for i in range(19)) + 28 * 2 // 3 - 28
+    )
+
+
+def test_reused_stack_slots():
+    statements = ["let s = 1;"]
+    for block in range(3):
+        names = [f"v{block}_{i}" for i in range(16)]
+        statements.extend(f"let {name} = s * {i};" for i, name in enumerate(names))
+        statements.append(f"s = {' - '.join(names)};")
+    assert compile_and_run(" ".join(statements) + " return s;") == -1728000
+
+
+@pytest.mark.parametrize("divisor", [2, 3, 4, 5, 7, 9, 10, 16, -3, -4, -7, 1 << 40])
+@pytest.mark.parametrize("numerator", [1000003, -1000003, 6, -6])
+def test_division_by_constant(numerator, divisor):
+    code = f"let a = {numerator}; return a / {divisor};"
+    assert compile_and_run(code) == truncating_division(numerator, divisor)
+
+
+@pytest.mark.parametrize("factor", [2, 3, 5, 8, 9, 10, -3])
+def test_multiplication_by_constant(factor):
+    code = f"let a = -7; let b = a * {factor}; let c = {factor} * b; return c;"
+    assert compile_and_run(code) == -7 * factor * factor
+
+
+def test_multiplication_by_wide_constant():
+    code = "let a = -7; let b = a * 10000000000; return b / 10000000000;"
+    assert compile_and_run(code) == -7
+
+
+def test_constant_times_wide_constant():
+    assert compile_and_run("return 7 * 5000000000 / 5000000000;") == 7
+    assert compile_and_run("return 5000000000 * -3 / 5000000000;") == -3
+
+
+def test_deep_left_expression():
+    expr, expected = "a", 3
+    for i in range(40):
+        expr = f"({expr} - a * {i})"
+        expected -= 3 * i
+    assert compile_and_run(
+        f"let a = 3; return {expr} / (a - 1);"
+    ) == truncating_division(expected, 2)
@@ -38,3 +38,11 @@ def test_redecleration():
         SemanticAnalyzer().analyze(ast_from_code("let a = 0;\nlet a = 0;"))
     assert excinfo.value.new_decleration.value == "a"
     assert excinfo.value.first_decleration.pos.line.number == 1
+
+
+def test_deeply_nested_expression():
+    depth = 100_000
+    code = "let a = 1; return " + "-(a + " * depth + "b" + ")" * depth + ";"
+    with pytest.raises(UndeclaredError) as excinfo:
+        SemanticAnalyzer().analyze(ast_from_code(code))
+    assert excinfo.value.identifier.value == "b"
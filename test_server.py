@@ -0,0 +1,145 @@
+import json
+import os
+import socket
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from client import CompileClient, RemoteCompilationError
+from compiler import compile_source
+from server import CompileServer, LatencyMetrics
+
+
+@pytest.fixture
+def socket_path(tmp_path):
+    path = str(tmp_path / "kalkar.sock")
+    server = CompileServer(path, workers=4)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    yield path
+    server.shutdown()
+    thread.join()
+
+
+def test_compile(socket_path):
+    code = "let a = 6; return a * 7;"
+    with CompileClient(socket_path) as client:
+        assert client.compile(code) == compile_source(code)
+        assert client.compile(code, opt_level=1) == compile_source(code, 1)
+
+
+def test_compile_executable(socket_path, tmp_path):
+    binary_path = str(tmp_path / "a.out")
+    with CompileClient(socket_path) as client:
+        binary = client.compile_executable("let a = 6; return a * 7;")
+    with open(binary_path, "wb") as output:
+        output.write(binary)
+    os.chmod(binary_path, 0o755)
+    assert subprocess.run([binary_path], capture_output=True).stdout == b"42\n"
+
+
+def test_diagnostics(socket_path):
+    with CompileClient(socket_path) as client:
+        with pytest.raises(RemoteCompilationError) as error:
+            client.compile("let a = 1;\nreturn b;")
+        # The connection is still usable after an error
+        assert client.compile("return 1;")
+    assert error.value.diagnostic["message"] == "Undeclared variable"
+    assert error.value.diagnostic["line"] == 2
+    assert error.value.diagnostic["start"] == 7
+    assert "^ Undeclared variable" in str(error.value)
+
+
+def test_too_wide_constant(socket_path):
+    with CompileClient(socket_path) as client:
+        with pytest.raises(RemoteCompilationError, match="doesn't fit"):
+            client.compile_executable("return 99999999999999999999999;")
+
+
+def test_bad_requests(socket_path):
+    with CompileClient(socket_path) as client:
+        for request in [{"source": 1}, {"source": "", "opt_level": 9}, [1]]:
+            with pytest.raises(RemoteCompilationError, match="Bad request"):
+                client.request(request)
+
+
+def test_malformed_json(socket_path):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(socket_path)
+        connection.sendall(b"{\n")
+        response = json.loads(connection.makefile("rb").readline())
+    assert not response["ok"]
+
+
+def test_concurrent_clients(socket_path):
+    def compile_many(index):
+        with CompileClient(socket_path) as client:
+            return all(
+                client.compile(f"return {index} + {i};")
+                == compile_source(f"return {index} + {i};")
+                for i in range(20)
+            )
+
+    with ThreadPoolExecutor(8) as executor:
+        assert all(executor.map(compile_many, range(8)))
+    with CompileClient(socket_path) as client:
+        stats = client.stats()
+    assert stats["requests"] == 160
+    assert stats["errors"] == 0
+    assert 0 < stats["p50_us"] <= stats["p99_us"] <= stats["max_us"]
+
+
+def test_shutdown_with_idle_client(tmp_path):
+    path = str(tmp_path / "kalkar.sock")
+    server = CompileServer(path, workers=2)
+    # Daemons, so that a shutdown hanging fails the test instead of pytest
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    client = CompileClient(path)
+    assert client.compile("return 1;")
+    stopping = threading.Thread(target=server.shutdown, daemon=True)
+    stopping.start()
+    stopping.join(timeout=5)
+    assert not stopping.is_alive()
+    thread.join(timeout=5)
+    with pytest.raises((ConnectionError, ValueError)):
+        client.compile("return 1;")
+    client.close()
+
+
+def test_idle_client_does_not_hold_a_worker(tmp_path):
+    path = str(tmp_path / "kalkar.sock")
+    server = CompileServer(path, workers=1)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    idle = CompileClient(path)
+    try:
+        assert idle.compile("return 1;")
+        client = CompileClient(path)
+        answers = []
+        asking = threading.Thread(
+            target=lambda: answers.append(client.compile("return 2;")), daemon=True
+        )
+        asking.start()
+        asking.join(timeout=5)
+        assert answers == [compile_source("return 2;")]
+    finally:
+        idle.close()
+        asking.join()
+        client.close()
+        server.shutdown()
+        thread.join()
+
+
+def test_latency_metrics():
+    metrics = LatencyMetrics(window=2)
+    metrics.record(1.0)
+    metrics.record(0.002, error=True)
+    metrics.record(0.001)
+    summary = metrics.summary()
+    assert summary["requests"] == 3
+    assert summary["errors"] == 1
+    assert summary["max_us"] == 1e6
+    assert summary["p50_us"] == 2000
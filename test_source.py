@@ -0,0 +1,76 @@
+import pytest
+
+from position import Position, Line
+from source import Source
+from lexing import Tokenizer, UnknownCharacher
+from tokens import Identifier, Keyword, Literal, Operator, Seperator
+
+
+def test_position_first_line():
+    assert Source("let a = 1;\nreturn a;").position(4, 5) == Position(
+        Line("let a = 1;", 1), 4, 5
+    )
+
+
+def test_position_last_line():
+    assert Source("let a = 1;\nreturn a;").position(18, 19) == Position(
+        Line("return a;", 2), 7, 8
+    )
+
+
+def test_position_after_empty_lines():
+    assert Source("\n\n  x").position(4, 5) == Position(Line("  x", 3), 2, 3)
+
+
+def test_line_index_is_lazy():
+    source = Source("a\nb")
+    list(Tokenizer.scan(source))
+    assert source._line_starts is None
+
+
+def test_tokens_store_offsets():
+    token = next(Tokenizer.scan("  foo"))
+    assert (token.start, token.end) == (2, 5)
+
+
+def test_memory_mapped_source(tmp_path):
+    path = tmp_path / "program.kal"
+    path.write_text("let a = 1;\nreturn a;")
+    source = Source.from_path(str(path))
+    tokens = list(Tokenizer.scan(source))
+    assert tokens == [
+        Keyword("let"),
+        Identifier("a"),
+        Operator("="),
+        Literal("1"),
+        Seperator(";"),
+        Keyword("return"),
+        Identifier("a"),
+        Seperator(";"),
+    ]
+    assert tokens[-2].pos == Position(Line("return a;", 2), 7, 8)
+
+
+def test_empty_memory_mapped_source(tmp_path):
+    path = tmp_path / "empty.kal"
+    path.write_text("")
+    assert list(Tokenizer.scan(Source.from_path(str(path)))) == []
+
+
+def test_unicode_memory_mapped_source(tmp_path):
+    path = tmp_path / "program.kal"
+    path.write_text("let é = 4;\nreturn é;", encoding="utf-8")
+    source = Source.from_path(str(path))
+    assert not source.is_binary
+    tokens = list(Tokenizer.scan(source))
+    assert tokens[1] == Identifier("é")
+    assert tokens[-2].pos == Position(Line("return é;", 2), 7, 8)
+
+
+def test_unicode_error_columns_count_characters(tmp_path):
+    path = tmp_path / "program.kal"
+    path.write_text("let é = 4 $;", encoding="utf-8")
+    with pytest.raises(UnknownCharacher) as error:
+        list(Tokenizer.scan(Source.from_path(str(path))))
+    assert error.value.position == Position(Line("let é = 4 $;", 1), 10, 11)
+    assert '"$"' in str(error.value)
@@ -0,0 +1,42 @@
+import pytest
+
+from bench_startup import profile_runs, scenarios
+
+# Import time of a compile through the fast path of main.py, with warm
+# bytecode caches. Measured at about 60 ms, the rest is headroom for slower
+# machines.
+IMPORT_BUDGET_MS = 150
+# Not needed to compile a single file at -O0
+DEFERRED_MODULES = [
+    "click",
+    "cli",
+    "subprocess",
+    "concurrent.futures",
+    "multiprocessing",
+    "ctypes",
+    "socket",
+    "server",
+    "client",
+    "jit",
+    "constant_folding",
+    "value_numbering",
+    "tracemalloc",
+    "json",
+]
+
+
+@pytest.fixture(scope="module")
+def fast_path_runs(tmp_path_factory):
+    directory = str(tmp_path_factory.mktemp("startup"))
+    args = scenarios(directory)["compile --backend native"]
+    return profile_runs(args, f"{directory}/pycache", directory, runs=3)
+
+
+def test_import_budget(fast_path_runs):
+    assert "code_gen" in fast_path_runs[0].modules
+    assert min(run.import_ms for run in fast_path_runs) < IMPORT_BUDGET_MS
+
+
+@pytest.mark.parametrize("module", DEFERRED_MODULES)
+def test_deferred_imports(fast_path_runs, module):
+    assert module not in fast_path_runs[0].modules
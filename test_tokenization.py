@@ -8,8 +8,9 @@ from tokens import (
     Literal,
     Operator,
     TokenKind,
+    Whitespace,
 )
-from lexing import Tokenizer, UnknownCharacher
+from lexing import EmptyProgramError, Tokenizer, UnknownCharacher
 
 
 def tokenize_once(line: str) -> TokenKind:
@@ -73,3 +74,72 @@ def test_error_position():
     with pytest.raises(UnknownCharacher) as excinfo:
         Tokenizer().tokenize("1337\na = 1$")
     assert excinfo.value.position == Position(Line("a = 1$", 2), 5, 6)
+
+
+def tokenize_per_class(content: str):
+    tokens = []
+    for line_number, text in enumerate(content.split("\n"), start=1):
+        line = Line(text, line_number)
+        offset = 0
+        while offset < len(text):
+            token = Tokenizer.token_at(line, offset)
+            offset = token.pos.end
+            if type(token) is not Whitespace:
+                tokens.append(token)
+    return tokens
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        "let a = 1;\nreturn a;",
+        "letter = returned + let_1;",
+        "1abc 2.3, a/b*c-d",
+        "  \n\n\tlet  x=(-(1));\n  \n",
+    ],
+)
+def test_master_pattern_matches_per_class_tokenization(content):
+    tokens = Tokenizer.scan(content)
+    expected = tokenize_per_class(content)
+    assert [(t, t.pos) for t in tokens] == [(t, t.pos) for t in expected]
+
+
+def test_keyword_prefix_of_identifier():
+    assert Tokenizer.tokenize_line(Line("letter", 1)) == [
+        Keyword("let"),
+        Identifier("ter"),
+    ]
+
+
+def test_error_position_at_end_of_input():
+    with pytest.raises(UnknownCharacher) as excinfo:
+        Tokenizer().tokenize("a = 1;\n\n  $")
+    assert excinfo.value.position == Position(Line("  $", 3), 2, 3)
+
+
+def test_stream_is_lazy():
+    tokens = Tokenizer().stream("a b $")
+    assert tokens.pop() == Identifier("a")
+    with pytest.raises(UnknownCharacher):
+        tokens.pop()
+
+
+def test_tokens_are_compact():
+    token = Tokenizer.tokenize_line(Line("foo", 1))[0]
+    assert not hasattr(token, "__dict__")
+    with pytest.raises(AttributeError):
+        token.value = "bar"
+
+
+def test_token_equality_ignores_position():
+    token = Tokenizer.tokenize_line(Line("  ;", 1))[0]
+    assert token == Seperator(";")
+    assert token != Operator(";")
+
+
+@pytest.mark.parametrize("program", ["", "  \n\t"])
+def test_empty_program(program):
+    with pytest.raises(EmptyProgramError):
+        Tokenizer().tokenize(program)
+    with pytest.raises(EmptyProgramError):
+        Tokenizer().stream(program)
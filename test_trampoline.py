@@ -0,0 +1,33 @@
+import pytest
+
+from trampoline import trampoline
+
+
+def countdown(n):
+    if n == 0:
+        return 0
+    return 1 + (yield countdown(n - 1))
+
+
+def test_plain_value():
+    assert trampoline(5) == 5
+
+
+def test_nested_generators():
+    assert trampoline(countdown(3)) == 3
+
+
+def test_deep_nesting():
+    assert trampoline(countdown(100_000)) == 100_000
+
+
+def test_exception_propagates():
+    def failing():
+        yield 1
+        raise ValueError("failed")
+
+    def outer():
+        yield failing()
+
+    with pytest.raises(ValueError):
+        trampoline(outer())
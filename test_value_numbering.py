@@ -0,0 +1,63 @@
+from parsing import Parser
+from lexing import Tokenizer
+from ast_lowering import LoweringPass
+from value_numbering import LocalValueNumbering
+from ir import LoadConstant, LoadVariable, BinaryOperation, Negate, Return
+
+
+def number(code: str):
+    ir = LoweringPass().lower(Parser().parse(Tokenizer().tokenize(code)))
+    return LocalValueNumbering().number(ir)
+
+
+def count(ir: list, op: str):
+    return sum(1 for i in ir if type(i) is BinaryOperation and i.op == op)
+
+
+def test_repeated_expression():
+    ir = number("let a = 2; let b = 3; let x = a * b + a * b; return x;")
+    assert count(ir, "*") == 1
+    assert BinaryOperation("%6", "+", "%4", "%4") in ir
+
+
+def test_commutative_operands():
+    assert count(number("let a = 2; let b = 3; return a * b - b * a;"), "*") == 1
+
+
+def test_non_commutative_operands():
+    assert count(number("let a = 2; let b = 3; return (a - b) * (b - a);"), "-") == 2
+
+
+def test_through_copies():
+    assert (
+        count(number("let a = 2; let b = 3; let c = a; return a / b + c / b;"), "/")
+        == 1
+    )
+
+
+def test_reassigned_variable():
+    ir = number("let a = 2; let b = a * a; a = 3; return b + a * a;")
+    assert count(ir, "*") == 2
+
+
+def test_repeated_constants_and_negations():
+    assert LocalValueNumbering().number(
+        [
+            LoadConstant("%0", 5),
+            LoadConstant("%1", 5),
+            Negate("%2", "%0"),
+            Negate("%3", "%1"),
+            BinaryOperation("%4", "+", "%2", "%3"),
+            Return("%4"),
+        ]
+    ) == [
+        LoadConstant("%0", 5),
+        Negate("%2", "%0"),
+        BinaryOperation("%4", "+", "%2", "%2"),
+        Return("%4"),
+    ]
+
+
+def test_copy_is_kept():
+    ir = [LoadConstant("%0", 1), LoadVariable("%1", "%0"), Return("%1")]
+    assert LocalValueNumbering().number(ir) == ir
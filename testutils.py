@@ -0,0 +1,45 @@
+"""
+Helpers shared by the test modules.
+"""
+
+import contextlib
+import os
+import subprocess
+import tempfile
+
+
+@contextlib.contextmanager
+def temp_path():
+    try:
+        yield "./a.out"
+    finally:
+        os.unlink("./a.out")
+
+
+def run_instructions(instructions):
+    with tempfile.NamedTemporaryFile(mode="w") as output, temp_path() as binary_path:
+        output.write("\n".join(instructions))
+        output.flush()
+        subprocess.run(
+            ["gcc", "-x", "assembler", output.name, "-o", binary_path], check=True
+        )
+        child = subprocess.run([binary_path], capture_output=True, check=True)
+    return int(child.stdout)
+
+
+def high_pressure_program(blocks: int, values: int = 20) -> str:
+    statements = ["let s = 0;"]
+    for block in range(blocks):
+        names = [f"v{block}_{i}" for i in range(values)]
+        statements.extend(f"let {name} = s + {i};" for i, name in enumerate(names))
+        statements.append(f"s = {' + '.join(names)};")
+    statements.append("return s;")
+    return "\n".join(statements)
+
+
+def deep_left_expression(depth: int) -> str:
+    declerations = " ".join(f"let v{i} = {i + 2};" for i in range(4))
+    expr = "v0"
+    for i in range(depth):
+        expr = f"({expr} - v{i % 4} * v{(i + 1) % 4})"
+    return f"{declerations} return {expr};"
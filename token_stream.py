@@ -1,10 +1,12 @@
+from typing import Iterable
+
 from tokens import Token
 from errors import CompilationError
 
 
 class EndOfInputError(CompilationError):
     def __init__(self, pos):
-        super().__init__(pos, 0, "Unexpected end of input")
+        super().__init__(pos, "Unexpected end of input")
 
 
 class TokenStream:
@@ -33,3 +35,40 @@ class TokenStream:
 
     def __repr__(self):
         return f"TokenStream({self.tokens})"
+
+
+class StreamingTokenStream(TokenStream):
+    """
+    Pulls tokens from an iterator on demand, keeping only the lookahead token
+    and the last popped one (for end of input errors) alive.
+    """
+
+    def __init__(self, tokens: Iterable[Token]):
+        self.tokens = iter(tokens)
+        self.lookahead = next(self.tokens, None)
+        if self.lookahead is None:
+            raise ValueError("Token list is empty")
+        self.last = None
+        # Tokens consumed so far, the total once parsed
+        self.popped = 0
+
+    def peek(self) -> Token:
+        if self.lookahead is None:
+            raise EndOfInputError(self.last.pos)
+        return self.lookahead
+
+    def pop(self) -> Token:
+        token = self.peek()
+        self.last = token
+        self.lookahead = next(self.tokens, None)
+        self.popped += 1
+        return token
+
+    def is_at_end(self):
+        return self.lookahead is None
+
+    def __len__(self):
+        raise TypeError("Length of a streaming token stream is unknown")
+
+    def __repr__(self):
+        return f"StreamingTokenStream(lookahead={self.lookahead})"
@@ -1,42 +1,56 @@
 import re
 from dataclasses import dataclass, field
-from typing import Optional, ClassVar, Union
+from typing import Optional, ClassVar, Union, TYPE_CHECKING
 from position import Position
 
+if TYPE_CHECKING:
+    from source import Source
 
-@dataclass
+
+# Only Token is a dataclass, its subclasses inherit the generated methods
+# instead of paying for generating their own when imported. __eq__ and
+# __repr__ still tell the subclasses apart.
+@dataclass(frozen=True, slots=True)
 class Token:
     value: str
-    pos: Optional[Position] = field(default=None, compare=False, repr=False)
+    start: int = field(default=0, compare=False, repr=False)
+    end: int = field(default=0, compare=False, repr=False)
+    source: Optional["Source"] = field(default=None, compare=False, repr=False)
+
+    @property
+    def pos(self) -> Optional[Position]:
+        if self.source is None:
+            return None
+        return self.source.position(self.start, self.end)
 
 
-@dataclass
 class Keyword(Token):
+    __slots__ = ()
     PATTERN: ClassVar[re.Pattern] = re.compile(r"(let|return)")
 
 
-@dataclass
 class Identifier(Token):
+    __slots__ = ()
     PATTERN: ClassVar[re.Pattern] = re.compile(r"([_\w][_\w\d]*)")
 
 
-@dataclass
 class Whitespace(Token):
+    __slots__ = ()
     PATTERN: ClassVar[re.Pattern] = re.compile(r"(\s+)")
 
 
-@dataclass
 class Seperator(Token):
+    __slots__ = ()
     PATTERN: ClassVar[re.Pattern] = re.compile(r"([\(\);])")
 
 
-@dataclass
 class Literal(Token):
+    __slots__ = ()
     PATTERN: ClassVar[re.Pattern] = re.compile(r"(\d+)")
 
 
-@dataclass
 class Operator(Token):
+    __slots__ = ()
     PATTERN: ClassVar[re.Pattern] = re.compile(r"([\+\*-/=])")
 
 
@@ -0,0 +1,28 @@
+from types import GeneratorType
+
+
+def trampoline(computation):
+    """
+    Runs a computation written as nested generators without growing the
+    Python stack.
+    A generator asks for the result of a sub-computation by yielding it, and
+    gets the result back from the yield expression. Anything that is not a
+    generator is treated as an already computed result.
+    """
+    if type(computation) is not GeneratorType:
+        return computation
+    stack = [computation]
+    result = None
+    while stack:
+        try:
+            yielded = stack[-1].send(result)
+        except StopIteration as stop:
+            stack.pop()
+            result = stop.value
+            continue
+        if type(yielded) is GeneratorType:
+            stack.append(yielded)
+            result = None
+        else:
+            result = yielded
+    return result
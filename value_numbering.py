@@ -0,0 +1,75 @@
+from typing import Dict, Tuple
+
+from ir import LoadConstant, LoadVariable, Negate, BinaryOperation, Return
+from dispatch import dispatchmethod
+
+
+class LocalValueNumbering:
+    """
+    Removes instructions recomputing an available value, and points their
+    uses to the value computed first.
+    Expressions are keyed on the operation and the value numbers of the
+    operands, copies share the number of their source. Since values are
+    never redefined, an available expression stays valid to the end.
+    """
+
+    COMMUTATIVE_OPERATIONS = {"+", "*"}
+
+    def __init__(self):
+        self.ir = []
+        self.numbers: Dict[str, str] = {}
+        self.expressions: Dict[Tuple, str] = {}
+        self.replacements: Dict[str, str] = {}
+        self.eliminated = 0
+
+    def number(self, ir: list) -> list:
+        for instruction in ir:
+            instruction = instruction.map_operands(self.replacement)
+            self.number_once(instruction)
+        return self.ir
+
+    def replacement(self, value: str) -> str:
+        return self.replacements.get(value, value)
+
+    def number_of(self, value: str) -> str:
+        return self.numbers.get(value, value)
+
+    @dispatchmethod
+    def number_once(self, instruction):
+        raise TypeError(f"No value numbering implemented for {type(instruction)}")
+
+    @number_once.register
+    def _(self, load: LoadConstant):
+        self.emit_unique(load, ("const", load.value))
+
+    @number_once.register
+    def _(self, load: LoadVariable):
+        self.numbers[load.dest] = self.number_of(load.source)
+        self.ir.append(load)
+
+    @number_once.register
+    def _(self, negate: Negate):
+        self.emit_unique(negate, ("neg", self.number_of(negate.source)))
+
+    @number_once.register
+    def _(self, operation: BinaryOperation):
+        operands = (self.number_of(operation.lhs), self.number_of(operation.rhs))
+        if operation.op in self.COMMUTATIVE_OPERATIONS:
+            operands = tuple(sorted(operands))
+        self.emit_unique(operation, (operation.op, *operands))
+
+    @number_once.register
+    def _(self, ret: Return):
+        self.ir.append(ret)
+
+    def emit_unique(self, instruction, key: Tuple):
+        try:
+            available = self.expressions[key]
+        except KeyError:
+            self.expressions[key] = instruction.dest
+            self.numbers[instruction.dest] = instruction.dest
+            self.ir.append(instruction)
+            return
+        self.replacements[instruction.dest] = available
+        self.numbers[instruction.dest] = self.number_of(available)
+        self.eliminated += 1